@@ -7,9 +7,12 @@ Uses real Devstral inference via Mistral API.
 
 import json
 import time
+import random
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Import existing components
 from request_feed import RequestFeed
@@ -22,32 +25,67 @@ from smart_bidder import (
     load_reputation,
     CONFIG
 )
-from autonomi_client import AutonomiClient
+from autonomi_client import get_client
+from prompt_cache import PromptCache
+
+# Watch-loop polling: start fast, back off while the feed is quiet
+POLL_MIN_SECONDS = 1
+POLL_MAX_SECONDS = 30
+
+# Requests processed concurrently per feed check
+MAX_WORKERS = 8
+
 
 class AutonomiBidder:
     """Smart bidder that operates on the Autonomi network."""
     
     def __init__(self):
         self.feed = RequestFeed(backend="anttp")
-        self.client = AutonomiClient(backend="anttp")
+        self.client = get_client("anttp")
         self.bidder_id = "mellanrum-free-ai"
+        self.prompt_cache = PromptCache()
+        self._seen_requests = set()
+        self._write_lock = threading.Lock()
+        
+        # Fields that are identical on every bid/result we publish
+        self._bid_base = {
+            "type": "ai_market_bid",
+            "version": "0.1",
+            "bidder": self.bidder_id,
+            "model": CONFIG["primary_model"],
+        }
+        self._result_base = {
+            "type": "ai_market_result",
+            "version": "0.1",
+            "bidder": self.bidder_id,
+            "model_used": CONFIG["primary_model"],
+        }
     
     def check_feed(self) -> List[Dict]:
         """Get open requests from the feed."""
         return self.feed.get_open_requests()
     
-    def should_bid(self, request: dict) -> bool:
-        """Decide whether to bid on a request."""
+    def should_bid(self, request: dict, full_request: dict = None,
+                   analysis: dict = None, capability: float = None) -> bool:
+        """Decide whether to bid on a request.
+        
+        full_request, analysis and capability may be passed in when the
+        caller already has them, to avoid re-fetching and re-analyzing.
+        """
         # Get full request details from Autonomi
-        full_request = self.feed.get_request(request["address"])
+        if full_request is None:
+            full_request = self.feed.get_request(request["address"])
         if not full_request:
             return False
         
         # Analyze the prompt
-        analysis = analyze_prompt(full_request.get("prompt", ""))
+        if analysis is None:
+            analysis = analyze_prompt(full_request.get("prompt", ""))
         
         # Check capability match
-        match = calculate_capability_match(CONFIG["primary_model"], analysis["category"])
+        match = capability
+        if match is None:
+            match = calculate_capability_match(CONFIG["primary_model"], analysis["category"])
         
         # Don't bid if poor match
         if match < 0.5:
@@ -56,14 +94,18 @@ class AutonomiBidder:
         
         return True
     
-    def create_bid(self, request: dict) -> dict:
+    def create_bid(self, request: dict, full_request: dict = None,
+                   analysis: dict = None, capability: float = None) -> dict:
         """Create a bid for a request."""
-        full_request = self.feed.get_request(request["address"])
-        analysis = analyze_prompt(full_request.get("prompt", ""))
+        if full_request is None:
+            full_request = self.feed.get_request(request["address"])
+        if analysis is None:
+            analysis = analyze_prompt(full_request.get("prompt", ""))
         
         # Get max price from request and calculate our bid
         max_price = full_request.get("max_price_ant", 0.1)
-        capability = calculate_capability_match(CONFIG["primary_model"], analysis["category"])
+        if capability is None:
+            capability = calculate_capability_match(CONFIG["primary_model"], analysis["category"])
         
         # Price based on complexity and capability
         base_price = max_price * 0.3 * (1 + analysis["complexity"] / 10)
@@ -73,13 +115,10 @@ class AutonomiBidder:
         bid_price = min(bid_price, max_price * 0.9)
         
         bid = {
-            "type": "ai_market_bid",
-            "version": "0.1",
+            **self._bid_base,
             "request_address": request["address"],
             "request_id": request["request_id"],
-            "bidder": self.bidder_id,
             "price_ant": round(bid_price, 4),
-            "model": CONFIG["primary_model"],
             "capability_match": capability,
             "estimated_time_seconds": 30,
             "created": datetime.now().isoformat()
@@ -87,6 +126,25 @@ class AutonomiBidder:
         
         return bid
     
+    def evaluate_and_bid(self, request: dict) -> Optional[Tuple[dict, dict, dict]]:
+        """Fetch, analyze and price a request in one pass.
+        
+        Returns (bid, full_request, analysis) when we should bid, else None.
+        full_request and analysis are handed back so execute_job and
+        record_job don't have to fetch or analyze the request again.
+        """
+        full_request = self.feed.get_request(request["address"])
+        if not full_request:
+            return None
+        analysis = analyze_prompt(full_request.get("prompt", ""))
+        capability = calculate_capability_match(CONFIG["primary_model"], analysis["category"])
+        
+        if not self.should_bid(request, full_request, analysis, capability):
+            return None
+        
+        bid = self.create_bid(request, full_request, analysis, capability)
+        return bid, full_request, analysis
+    
     def submit_bid(self, bid: dict) -> Optional[str]:
         """Submit bid to Autonomi."""
         address = self.client.backend.upload_data(bid)
@@ -95,9 +153,11 @@ class AutonomiBidder:
             print(f"  Address: {address}")
         return address
     
-    def execute_job(self, request_address: str, bid_address: str) -> Optional[dict]:
+    def execute_job(self, request_address: str, bid_address: str,
+                    request: dict = None, analysis: dict = None) -> Optional[dict]:
         """Execute the inference job and return result."""
-        request = self.feed.get_request(request_address)
+        if request is None:
+            request = self.feed.get_request(request_address)
         if not request:
             print(f"Error: Could not retrieve request {request_address}")
             return None
@@ -108,20 +168,27 @@ class AutonomiBidder:
         print(f"🤖 Executing inference...")
         print(f"   Prompt: {prompt[:50]}...")
         
-        # Run real inference
-        response = run_inference(prompt, CONFIG["primary_model"], max_tokens)
-        analysis = analyze_prompt(prompt)
-        quality = estimate_quality(response, prompt, analysis)
+        # Reuse a cached response for the same (or near-identical) prompt
+        cached = self.prompt_cache.lookup(prompt, CONFIG["primary_model"], max_tokens)
+        if cached:
+            print(f"   Cache hit - skipping inference")
+            response = cached["response"]
+            quality = cached["quality"]
+        else:
+            # Run real inference
+            response = run_inference(prompt, CONFIG["primary_model"], max_tokens)
+            if analysis is None:
+                analysis = analyze_prompt(prompt)
+            quality = estimate_quality(response, prompt, analysis)
+            self.prompt_cache.store(prompt, CONFIG["primary_model"], max_tokens,
+                                    response, quality)
         
         result = {
-            "type": "ai_market_result",
-            "version": "0.1",
+            **self._result_base,
             "request_address": request_address,
             "bid_address": bid_address,
-            "bidder": self.bidder_id,
             "response": response,
             "quality_estimate": quality,
-            "model_used": CONFIG["primary_model"],
             "completed": datetime.now().isoformat()
         }
         
@@ -136,47 +203,79 @@ class AutonomiBidder:
             print(f"  Quality: {result['quality_estimate']:.2f}")
         return address
     
-    def run_once(self):
-        """Check feed once and process any open requests."""
+    def _process_one(self, req: dict):
+        """Bid on, execute and settle a single open request."""
+        print(f"\n📝 {req['request_id']}")
+        
+        evaluated = self.evaluate_and_bid(req)
+        if not evaluated:
+            return
+        
+        # Submit bid
+        bid, full_request, analysis = evaluated
+        bid_address = self.submit_bid(bid)
+        if not bid_address:
+            return
+        
+        # For demo: immediately execute (normally would wait for selection)
+        result = self.execute_job(req["address"], bid_address,
+                                  full_request, analysis)
+        if not result:
+            print("  ⚠ Job execution failed")
+            return
+        
+        result_address = self.submit_result(result)
+        if not result_address:
+            return
+        
+        # reputation.json and the feed pointer are read-modify-write files
+        with self._write_lock:
+            # Mark request as complete in local feed (first, so a reputation
+            # failure can't leave a finished job looking open)
+            self.feed.mark_complete(req["request_id"], result_address)
+            
+            # Update reputation
+            record_job(
+                analysis["category"],
+                bid["price_ant"],
+                result["quality_estimate"]
+            )
+        
+        print(f"✓ Job complete! Response preview:")
+        print(f"   {result['response'][:100]}...")
+    
+    def _process_safely(self, req: dict):
+        """_process_one, with a failure reported instead of raised, so one
+        bad request can't abort the rest of the batch."""
+        try:
+            self._process_one(req)
+        except Exception as e:
+            print(f"  ⚠ {req['request_id']} failed: {e}")
+    
+    def run_once(self) -> int:
+        """Check feed once and process any open requests.
+        
+        Returns how many requests were new since the previous check.
+        """
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Checking Autonomi feed...")
         
         requests = self.check_feed()
         print(f"   Open requests: {len(requests)}")
         
+        new_requests = 0
         for req in requests:
-            print(f"\n📝 {req['request_id']}")
-            
-            if self.should_bid(req):
-                # Create and submit bid
-                bid = self.create_bid(req)
-                bid_address = self.submit_bid(bid)
-                
-                if bid_address:
-                    # For demo: immediately execute (normally would wait for selection)
-                    result = self.execute_job(req["address"], bid_address)
-                    
-                    if not result:
-                        print("  ⚠ Job execution failed")
-                        continue
-                    
-                    result_address = self.submit_result(result)
-                    
-                    if result_address:
-                        # Update reputation
-                        analysis = analyze_prompt(
-                            self.feed.get_request(req["address"]).get("prompt", "")
-                        )
-                        record_job(
-                            analysis["category"],
-                            bid["price_ant"],
-                            result["quality_estimate"]
-                        )
-                        
-                        # Mark request as complete in local feed
-                        self.feed.mark_complete(req["request_id"], result_address)
-                        
-                        print(f"✓ Job complete! Response preview:")
-                        print(f"   {result['response'][:100]}...")
+            if req["request_id"] not in self._seen_requests:
+                self._seen_requests.add(req["request_id"])
+                new_requests += 1
+        
+        if requests:
+            # Each request is dominated by HTTP and inference waits, so
+            # handle them concurrently; their feed updates land in one write
+            with self.feed.transaction():
+                with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(requests))) as pool:
+                    list(pool.map(self._process_safely, requests))
+        
+        return new_requests
 
 
 def main():
@@ -199,10 +298,15 @@ def main():
     elif cmd == "watch":
         print("🔄 Watching Autonomi feed for requests...")
         print("   Press Ctrl+C to stop\n")
+        delay = POLL_MIN_SECONDS
         while True:
             try:
-                bidder.run_once()
-                time.sleep(30)
+                if bidder.run_once():
+                    delay = POLL_MIN_SECONDS
+                else:
+                    delay = min(delay * 2, POLL_MAX_SECONDS)
+                # Jitter so several bidders don't poll the gateway in lockstep
+                time.sleep(delay * random.uniform(0.8, 1.2))
             except KeyboardInterrupt:
                 print("\n👋 Stopping bidder")
                 break
@@ -9,13 +9,34 @@ Supports two backends:
 When AntTP is available and network is live, switch to 'anttp' backend.
 """
 
-import json
 import time
+import hashlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Dict
 from functools import wraps
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import dumps, loads, connect_db, atomic_write
+
+# Optional faster content hash for local archives
+try:
+    import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+
+# Optional archive compression
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
 
 # ═══════════════════════════════════════════════════════════════════
 # CONFIGURATION
@@ -24,7 +45,11 @@ from functools import wraps
 CONFIG = {
     "backend": "local",               # "local" or "anttp"
     "anttp_url": "http://localhost:18888",
-    "local_dir": Path(__file__).parent / "queue"
+    "local_dir": Path(__file__).parent / "queue",
+    "archive_hash": "sha256",         # "sha256" or "blake3" (local archive addresses)
+    "upload_cache_size": 4096,        # Remembered AntTP upload addresses
+    "data_cache_size": 1024,          # Fetched AntTP payloads kept in memory
+    "compress_archives": False        # zstd-compress local archives (needs zstandard)
 }
 
 
@@ -57,18 +82,36 @@ class LocalBackend:
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
         self.base_dir.mkdir(exist_ok=True)
+        # atomic_write's temp name is per process, so threads take turns
+        self._scratchpad_lock = threading.Lock()
+        
+        # Archives are small immutable blobs; keep them in one SQLite file
+        # instead of an inode each. Scratchpads stay as JSON files since
+        # queue_simulator reads and writes the same files.
+        self._archive_lock = threading.Lock()
+        self.archives = connect_db(base_dir / "archives.db", check_same_thread=False)
+        self.archives.execute("PRAGMA mmap_size=268435456")
+        self.archives.execute("""
+            CREATE TABLE IF NOT EXISTS archives (
+                address TEXT PRIMARY KEY,
+                blob BLOB NOT NULL,
+                compressed INTEGER NOT NULL DEFAULT 0
+            )
+        """)
     
     def read_scratchpad(self, name: str) -> dict:
         """Read mutable data (scratchpad simulation)."""
         path = self.base_dir / f"{name}.json"
-        if path.exists():
-            return json.loads(path.read_text())
-        return {}
+        try:
+            return loads(path.read_bytes())
+        except FileNotFoundError:
+            return {}
     
     def write_scratchpad(self, name: str, data: dict):
         """Write mutable data (scratchpad simulation)."""
-        path = self.base_dir / f"{name}.json"
-        path.write_text(json.dumps(data, indent=2))
+        payload = dumps(data)
+        with self._scratchpad_lock:
+            atomic_write(self.base_dir / f"{name}.json", payload)
     
     def get_pointer(self, name: str) -> Optional[str]:
         """Get pointer to current data (returns 'latest' key)."""
@@ -82,20 +125,50 @@ class LocalBackend:
             "updated": datetime.now().isoformat()
         })
     
+    def _content_address(self, content: bytes) -> str:
+        """16 hex char address for archive content."""
+        if CONFIG["archive_hash"] == "blake3" and HAS_BLAKE3:
+            return blake3.blake3(content).hexdigest(length=8)
+        return hashlib.sha256(content).hexdigest()[:16]
+    
     def upload_archive(self, name: str, data: dict) -> str:
         """Upload immutable archive, return 'address'."""
-        import hashlib
-        content = json.dumps(data, sort_keys=True)
-        address = hashlib.sha256(content.encode()).hexdigest()[:16]
-        path = self.base_dir / f"archive_{address}.json"
-        path.write_text(content)
+        content = dumps(data, sort_keys=True)
+        # Address is always the hash of the uncompressed bytes
+        address = self._content_address(content)
+        compressed = CONFIG["compress_archives"] and HAS_ZSTD
+        if compressed:
+            content = zstandard.ZstdCompressor(level=3).compress(content)
+        with self._archive_lock, self.archives:
+            self.archives.execute(
+                "INSERT OR IGNORE INTO archives (address, blob, compressed) VALUES (?, ?, ?)",
+                (address, content, int(compressed))
+            )
         return address
     
     def get_archive(self, address: str) -> dict:
         """Retrieve archive by address."""
+        with self._archive_lock:
+            row = self.archives.execute(
+                "SELECT blob, compressed FROM archives WHERE address = ?", (address,)
+            ).fetchone()
+        if row:
+            if row["compressed"]:
+                if not HAS_ZSTD:
+                    return {}
+                return loads(zstandard.ZstdDecompressor().decompress(row["blob"]))
+            return loads(row["blob"])
+        
+        # Archives written before the blob store are still plain files
         path = self.base_dir / f"archive_{address}.json"
-        if path.exists():
-            return json.loads(path.read_text())
+        try:
+            return loads(path.read_bytes())
+        except FileNotFoundError:
+            pass
+        
+        compressed = path.with_name(path.name + ".zst")
+        if HAS_ZSTD and compressed.exists():
+            return loads(zstandard.ZstdDecompressor().decompress(compressed.read_bytes()))
         return {}
 
 # ═══════════════════════════════════════════════════════════════════
@@ -111,6 +184,37 @@ class AntTPBackend:
     
     def __init__(self, base_url: str):
         self.base_url = base_url.rstrip('/')
+        
+        # One pooled keep-alive session for the lifetime of the backend
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+            "x-cache-only": "none"
+        })
+        
+        # Content hash -> address of payloads already uploaded (LRU)
+        self._upload_cache: OrderedDict = OrderedDict()
+        self._upload_lock = threading.Lock()
+        
+        # Address -> raw bytes of fetched public data (LRU). Public data is
+        # immutable, so entries never go stale; bytes are re-parsed per call
+        # so callers can't mutate each other's results.
+        self._data_cache: OrderedDict = OrderedDict()
+    
+    def _remember_upload(self, key: bytes, address: str):
+        with self._upload_lock:
+            self._upload_cache[key] = address
+            self._upload_cache.move_to_end(key)
+            while len(self._upload_cache) > CONFIG["upload_cache_size"]:
+                self._upload_cache.popitem(last=False)
     
     def upload_data(self, data: dict, cache_only: bool = False) -> Optional[str]:
         """Upload JSON data to Autonomi, return address.
@@ -118,34 +222,68 @@ class AntTPBackend:
         Args:
             data: JSON-serializable data to upload
             cache_only: If True, only cache locally (free). If False, upload to network (costs ANT).
+        
+        Identical payloads are content-addressed to the same location, so a
+        repeat upload returns the remembered address without a round-trip.
         """
+        # Canonical bytes for the dedup key; the body keeps caller key order
+        canonical = dumps(data, sort_keys=True)
+        digest = blake3.blake3(canonical).digest() if HAS_BLAKE3 else hashlib.sha256(canonical).digest()
+        key = (b"m" if cache_only else b"n") + digest
+        with self._upload_lock:
+            address = self._upload_cache.get(key)
+            if address:
+                self._upload_cache.move_to_end(key)
+                return address
+        
         try:
-            cache_header = "memory" if cache_only else "none"
-            resp = requests.post(
+            resp = self.session.post(
                 f"{self.base_url}/anttp-0/binary/public_data",
-                headers={
-                    "Content-Type": "application/json",
-                    "x-cache-only": cache_header
-                },
-                json=data,
+                headers={"x-cache-only": "memory"} if cache_only else None,
+                data=dumps(data),
                 timeout=60
             )
             if resp.status_code in (200, 201):
-                result = resp.json()
-                return result.get("address")
+                result = loads(resp.content)
+                address = result.get("address")
+                if address:
+                    self._remember_upload(key, address)
+                return address
         except requests.RequestException as e:
             print(f"AntTP upload error: {e}")
         return None
     
+    def upload_data_batch(self, items: List[dict], cache_only: bool = False) -> List[Optional[str]]:
+        """Upload several independent JSON payloads concurrently.
+        
+        Requests share the pooled session, so their round-trips overlap
+        instead of running back to back. Returns addresses in input order.
+        """
+        if len(items) <= 1:
+            return [self.upload_data(item, cache_only) for item in items]
+        with ThreadPoolExecutor(max_workers=min(8, len(items))) as pool:
+            return list(pool.map(lambda item: self.upload_data(item, cache_only), items))
+    
     def get_data(self, address: str) -> dict:
-        """Retrieve data from Autonomi by address."""
+        """Retrieve data from Autonomi by address (cached; see _data_cache)."""
+        with self._upload_lock:
+            content = self._data_cache.get(address)
+            if content is not None:
+                self._data_cache.move_to_end(address)
+        if content is not None:
+            return loads(content)
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 f"{self.base_url}/anttp-0/binary/public_data/{address}",
                 timeout=30
             )
             if resp.status_code == 200:
-                return resp.json()
+                data = loads(resp.content)
+                with self._upload_lock:
+                    self._data_cache[address] = resp.content
+                    while len(self._data_cache) > CONFIG["data_cache_size"]:
+                        self._data_cache.popitem(last=False)
+                return data
         except requests.RequestException as e:
             print(f"AntTP get error: {e}")
         return {}
@@ -171,12 +309,12 @@ class AntTPBackend:
     def get_pointer(self, address: str) -> Optional[str]:
         """Get pointer - uses /anttp-0/pointer endpoint."""
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 f"{self.base_url}/anttp-0/pointer/{address}",
                 timeout=30
             )
             if resp.status_code == 200:
-                return resp.json().get("target")
+                return loads(resp.content).get("target")
         except requests.RequestException as e:
             print(f"AntTP pointer error: {e}")
         return None
@@ -184,10 +322,9 @@ class AntTPBackend:
     def set_pointer(self, address: str, target: str) -> bool:
         """Set pointer - uses /anttp-0/pointer endpoint."""
         try:
-            resp = requests.put(
+            resp = self.session.put(
                 f"{self.base_url}/anttp-0/pointer/{address}",
-                headers={"x-cache-only": "none"},
-                json={"target": target},
+                data=dumps({"target": target}),
                 timeout=30
             )
             return resp.status_code in (200, 201)
@@ -202,6 +339,14 @@ class AntTPBackend:
 class AutonomiClient:
     """Unified client that can use either backend."""
     
+    # Backend methods exposed directly on the client
+    FORWARDED = (
+        "upload_data", "upload_data_batch", "get_data",
+        "upload_archive", "get_archive",
+        "read_scratchpad", "write_scratchpad",
+        "get_pointer", "set_pointer",
+    )
+    
     def __init__(self, backend: str = None, **kwargs):
         backend = backend or CONFIG["backend"]
         
@@ -213,21 +358,38 @@ class AutonomiClient:
             raise ValueError(f"Unknown backend: {backend}")
         
         self.backend_name = backend
-    
-    def __getattr__(self, name):
-        """Proxy all calls to the backend."""
-        return getattr(self.backend, name)
+        
+        # Bind the backend's methods onto the instance so calls are a
+        # plain attribute hit rather than a __getattr__ round-trip
+        for name in self.FORWARDED:
+            method = getattr(self.backend, name, None)
+            if method is not None:
+                setattr(self, name, method)
     
     def health_check(self) -> bool:
         """Check if backend is available."""
         if self.backend_name == "local":
             return True
         try:
-            resp = requests.get(f"{CONFIG['anttp_url']}/health", timeout=5)
+            resp = self.backend.session.get(f"{self.backend.base_url}/health", timeout=5)
             return resp.status_code == 200
         except:
             return False
 
+# One client per backend configuration, so every feed, bidder and escrow
+# in the process shares the same pooled session and caches
+_CLIENTS: Dict[tuple, AutonomiClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_client(backend: str = None, **kwargs) -> AutonomiClient:
+    """Return the shared AutonomiClient for this backend and options."""
+    key = (backend or CONFIG["backend"], tuple(sorted(kwargs.items())))
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = AutonomiClient(backend, **kwargs)
+    return client
+
 # ═══════════════════════════════════════════════════════════════════
 # CLI
 # ═══════════════════════════════════════════════════════════════════
@@ -6,13 +6,16 @@ All escrow state transitions are recorded as immutable data.
 Now with optional real ANT transfers via wallet_transfer.py.
 """
 
-import json
+import time
+import sqlite3
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator
+from contextlib import contextmanager
 from enum import Enum
 from pathlib import Path
 
-from autonomi_client import AutonomiClient
+from autonomi_client import get_client
+from storage import dumps, loads, connect_db, durable
 
 # Optional wallet integration
 try:
@@ -21,6 +24,16 @@ try:
 except ImportError:
     HAS_WALLET = False
 
+# Built on first real transfer and reused: wallet setup loads the key and
+# opens the RPC provider, which shouldn't be paid per approval
+_wallet = None
+
+def _get_wallet() -> "ANTWallet":
+    global _wallet
+    if _wallet is None:
+        _wallet = ANTWallet()
+    return _wallet
+
 
 class EscrowState(str, Enum):
     CREATED = "created"        # Requester created escrow
@@ -32,21 +45,156 @@ class EscrowState(str, Enum):
     REFUNDED = "refunded"      # Refunded to requester
 
 
+def _now_iso() -> str:
+    """Timestamp for escrow records; call once per record and reuse it."""
+    return datetime.now().isoformat()
+
+
+def _row_to_info(row) -> dict:
+    """Cached escrow row -> the dict shape the JSON cache used (unset fields omitted)."""
+    return {
+        key: row[key] for key in row.keys()
+        if key not in ("address", "updated") and row[key] is not None
+    }
+
+
 class AutonomiEscrow:
     """Manages escrows with state stored on Autonomi."""
     
     def __init__(self):
-        self.client = AutonomiClient(backend="anttp")
-        self.local_cache = Path(__file__).parent / "data" / "escrow_cache.json"
-        self.local_cache.parent.mkdir(parents=True, exist_ok=True)
+        self.client = get_client("anttp")
+        data_dir = Path(__file__).parent / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        
+        # One row per escrow, so a state change rewrites one row, not the file
+        self.db = connect_db(data_dir / "escrow_cache.db")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS escrows (
+                address TEXT PRIMARY KEY,
+                request_address TEXT,
+                amount_ant REAL,
+                state TEXT,
+                bidder TEXT,
+                agreed_price REAL,
+                result_address TEXT,
+                updated INTEGER
+            )
+        """)
+        self._import_legacy_cache(data_dir / "escrow_cache.json")
+        
+        # State updates queued by begin_batch(), uploaded by commit_batch()
+        self._pending_uploads = None
+        # Updates from the last commit_batch() that didn't upload, so the
+        # caller can see which escrows are behind and publish them again
+        self.failed_updates: List[dict] = []
+    
+    def _import_legacy_cache(self, path: Path):
+        """One-time import of the old escrow_cache.json into an empty table."""
+        if not path.exists():
+            return
+        if self.db.execute("SELECT 1 FROM escrows LIMIT 1").fetchone():
+            return
+        escrows = loads(path.read_bytes()).get("escrows", {})
+        now = int(time.time())
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO escrows "
+                "(address, request_address, amount_ant, state, bidder, "
+                "agreed_price, result_address, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(addr, e.get("request_address"), e.get("amount_ant"), e.get("state"),
+                  e.get("bidder"), e.get("agreed_price"), e.get("result_address"), now)
+                 for addr, e in escrows.items()]
+            )
     
-    def _load_cache(self) -> dict:
-        if self.local_cache.exists():
-            return json.loads(self.local_cache.read_text())
-        return {"escrows": {}}
+    def _update_cache(self, escrow_address: str, **fields):
+        """Set columns on one cached escrow (no-op if it isn't cached)."""
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self.db:
+            self.db.execute(
+                f"UPDATE escrows SET {columns}, updated = ? WHERE address = ?",
+                (*fields.values(), int(time.time()), escrow_address)
+            )
     
-    def _save_cache(self, data: dict):
-        self.local_cache.write_text(json.dumps(data, indent=2))
+    def begin_batch(self):
+        """Queue state updates instead of uploading each one immediately.
+        
+        While a batch is open, assign_bidder / submit_result /
+        approve_payment / dispute return a "pending:<n>" placeholder and
+        leave the local cache alone (reads through _get_cached still see
+        the queued changes); commit_batch() uploads the queued updates
+        concurrently and only then applies each escrow's cache change.
+        create_escrow always uploads, since its address is what the later
+        updates refer to.
+        """
+        if self._pending_uploads is None:
+            self._pending_uploads = []
+    
+    def commit_batch(self) -> List[Optional[str]]:
+        """Upload queued updates; returns their addresses in queue order.
+        
+        Failed uploads come back as None, keep their escrow's cache as it
+        was, and are listed in self.failed_updates.
+        """
+        pending, self._pending_uploads = self._pending_uploads or [], None
+        self.failed_updates = []
+        if not pending:
+            return []
+        addresses = self.client.backend.upload_data_batch(
+            [update for update, _, _ in pending])
+        for (update, fields, must_persist), address in zip(pending, addresses):
+            if address:
+                self._apply_cache(update["escrow_address"], fields, must_persist)
+            else:
+                self.failed_updates.append(update)
+        print(f"✓ Uploaded {len(pending) - len(self.failed_updates)}/{len(pending)} escrow updates")
+        for update in self.failed_updates:
+            print(f"  ✗ {update['escrow_address'][:16]}... → {update['new_state']} not uploaded")
+        return addresses
+    
+    def discard_batch(self):
+        """Drop queued updates without uploading them."""
+        self._pending_uploads = None
+    
+    @contextmanager
+    def batch(self):
+        """with escrow.batch(): ... -- commits only if the block succeeds."""
+        self.begin_batch()
+        try:
+            yield self
+        except BaseException:
+            self.discard_batch()
+            raise
+        self.commit_batch()
+    
+    def _publish(self, update: dict, fields: dict, must_persist: bool = False) -> Optional[str]:
+        """Upload a state update and cache `fields`, or queue both if a batch is open."""
+        if self._pending_uploads is not None:
+            self._pending_uploads.append((update, fields, must_persist))
+            return f"pending:{len(self._pending_uploads) - 1}"
+        address = self.client.backend.upload_data(update)
+        if address:
+            self._apply_cache(update["escrow_address"], fields, must_persist)
+        return address
+    
+    def _apply_cache(self, escrow_address: str, fields: dict, must_persist: bool):
+        if must_persist:
+            with durable(self.db):
+                self._update_cache(escrow_address, **fields)
+        else:
+            self._update_cache(escrow_address, **fields)
+    
+    def _get_cached(self, escrow_address: str) -> dict:
+        """Cached escrow, with changes queued in an open batch laid over it."""
+        row = self.db.execute(
+            "SELECT * FROM escrows WHERE address = ?", (escrow_address,)
+        ).fetchone()
+        info = _row_to_info(row) if row else {}
+        if info:
+            for update, fields, _ in self._pending_uploads or ():
+                if update["escrow_address"] == escrow_address:
+                    info.update(fields)
+        return info
     
     def create_escrow(self, request_address: str, amount_ant: float, 
                       requester: str) -> str:
@@ -54,6 +202,7 @@ class AutonomiEscrow:
         
         Returns the escrow address on Autonomi.
         """
+        now = _now_iso()
         escrow = {
             "type": "ai_market_escrow",
             "version": "0.1",
@@ -61,13 +210,13 @@ class AutonomiEscrow:
             "amount_ant": amount_ant,
             "requester": requester,
             "state": EscrowState.FUNDED.value,  # Simulating funded
-            "created": datetime.now().isoformat(),
+            "created": now,
             "history": [{
                 "state": EscrowState.CREATED.value,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now
             }, {
                 "state": EscrowState.FUNDED.value,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now,
                 "note": "Simulated: ANT locked in escrow"
             }]
         }
@@ -79,13 +228,14 @@ class AutonomiEscrow:
             print(f"  Address: {address}")
             
             # Cache locally
-            cache = self._load_cache()
-            cache["escrows"][address] = {
-                "request_address": request_address,
-                "amount_ant": amount_ant,
-                "state": EscrowState.FUNDED.value
-            }
-            self._save_cache(cache)
+            with self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO escrows "
+                    "(address, request_address, amount_ant, state, updated) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (address, request_address, amount_ant,
+                     EscrowState.FUNDED.value, int(time.time()))
+                )
         
         return address
     
@@ -95,7 +245,11 @@ class AutonomiEscrow:
         
         Returns address of the state update.
         """
-        escrow = self.client.backend.get_data(escrow_address)
+        # The local cache tracks the current state; only fetch the escrow
+        # from the network when we haven't seen it before
+        escrow = self._get_cached(escrow_address)
+        if not escrow:
+            escrow = self.client.backend.get_data(escrow_address)
         if not escrow:
             print("Error: Escrow not found")
             return None
@@ -109,22 +263,15 @@ class AutonomiEscrow:
             "bidder": bidder,
             "bid_address": bid_address,
             "agreed_price": price,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         }
         
-        address = self.client.backend.upload_data(update)
+        address = self._publish(update, {"state": EscrowState.ASSIGNED.value,
+                                         "bidder": bidder, "agreed_price": price})
         
         if address:
             print(f"✓ Escrow assigned to {bidder}")
             print(f"  Agreed price: {price} ANT")
-            
-            # Update cache
-            cache = self._load_cache()
-            if escrow_address in cache["escrows"]:
-                cache["escrows"][escrow_address]["state"] = EscrowState.ASSIGNED.value
-                cache["escrows"][escrow_address]["bidder"] = bidder
-                cache["escrows"][escrow_address]["agreed_price"] = price
-                self._save_cache(cache)
         
         return address
     
@@ -139,19 +286,14 @@ class AutonomiEscrow:
             "escrow_address": escrow_address,
             "new_state": EscrowState.SUBMITTED.value,
             "result_address": result_address,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         }
         
-        address = self.client.backend.upload_data(update)
+        address = self._publish(update, {"state": EscrowState.SUBMITTED.value,
+                                         "result_address": result_address})
         
         if address:
             print(f"✓ Result submission recorded")
-            
-            cache = self._load_cache()
-            if escrow_address in cache["escrows"]:
-                cache["escrows"][escrow_address]["state"] = EscrowState.SUBMITTED.value
-                cache["escrows"][escrow_address]["result_address"] = result_address
-                self._save_cache(cache)
         
         return address
     
@@ -168,8 +310,7 @@ class AutonomiEscrow:
         
         Returns address of the state update.
         """
-        cache = self._load_cache()
-        escrow_info = cache.get("escrows", {}).get(escrow_address, {})
+        escrow_info = self._get_cached(escrow_address)
         amount = escrow_info.get("agreed_price", 0)
         
         transfer_result = "simulated"
@@ -179,7 +320,7 @@ class AutonomiEscrow:
         if real_transfer and bidder_address and HAS_WALLET:
             print(f"💰 Initiating real ANT transfer...")
             try:
-                wallet = ANTWallet()
+                wallet = _get_wallet()
                 tx_hash = wallet.transfer_ant(bidder_address, amount, dry_run=False)
                 if tx_hash and tx_hash != "dry_run_tx_hash":
                     transfer_result = "completed"
@@ -201,20 +342,19 @@ class AutonomiEscrow:
             "payment_released": amount,
             "transfer_result": transfer_result,
             "tx_hash": tx_hash,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _now_iso(),
             "note": f"Payment {'transferred' if transfer_result == 'completed' else 'approved (simulated)'}"
         }
         
-        address = self.client.backend.upload_data(update)
+        # Payment release is the state we can't afford to lose
+        address = self._publish(update, {"state": EscrowState.APPROVED.value},
+                                must_persist=True)
         
         if address:
             print(f"✓ Payment approved!")
             print(f"  {amount} ANT → {escrow_info.get('bidder', 'bidder')}")
             if transfer_result == "completed":
                 print(f"  ✓ Real transfer completed!")
-            
-            cache["escrows"][escrow_address]["state"] = EscrowState.APPROVED.value
-            self._save_cache(cache)
         
         return address
     
@@ -226,29 +366,28 @@ class AutonomiEscrow:
             "escrow_address": escrow_address,
             "new_state": EscrowState.DISPUTED.value,
             "reason": reason,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         }
         
-        address = self.client.backend.upload_data(update)
+        address = self._publish(update, {"state": EscrowState.DISPUTED.value})
         
         if address:
             print(f"⚠ Dispute opened")
             print(f"  Reason: {reason}")
-            
-            cache = self._load_cache()
-            if escrow_address in cache["escrows"]:
-                cache["escrows"][escrow_address]["state"] = EscrowState.DISPUTED.value
-                self._save_cache(cache)
         
         return address
     
+    def iter_escrows(self) -> Iterator[sqlite3.Row]:
+        """Yield cached escrows as read-only rows, without copying to dicts.
+        
+        Rows index by column name (address, state, amount_ant, ...); unset
+        fields are None rather than missing.
+        """
+        yield from self.db.execute("SELECT * FROM escrows ORDER BY rowid")
+    
     def list_escrows(self) -> List[Dict]:
         """List all cached escrows."""
-        cache = self._load_cache()
-        return [
-            {"address": addr, **info} 
-            for addr, info in cache.get("escrows", {}).items()
-        ]
+        return [{"address": row["address"], **_row_to_info(row)} for row in self.iter_escrows()]
 
 
 def main():
@@ -281,41 +420,47 @@ def main():
             print("Failed to create escrow")
             return
         
-        # Assign bidder
-        print("\n2. Assigning bidder...")
-        escrow.assign_bidder(
-            escrow_address=escrow_addr,
-            bidder="mellanrum-free-ai",
-            bid_address="demo_bid_456",
-            price=0.05
-        )
-        
-        # Submit result
-        print("\n3. Submitting result...")
-        escrow.submit_result(
-            escrow_address=escrow_addr,
-            result_address="demo_result_789"
-        )
-        
-        # Approve payment
-        print("\n4. Approving payment...")
-        escrow.approve_payment(
-            escrow_address=escrow_addr,
-            quality_score=0.85
-        )
+        # Remaining transitions only reference escrow_addr, so upload
+        # them together
+        with escrow.batch():
+            # Assign bidder
+            print("\n2. Assigning bidder...")
+            escrow.assign_bidder(
+                escrow_address=escrow_addr,
+                bidder="mellanrum-free-ai",
+                bid_address="demo_bid_456",
+                price=0.05
+            )
+            
+            # Submit result
+            print("\n3. Submitting result...")
+            escrow.submit_result(
+                escrow_address=escrow_addr,
+                result_address="demo_result_789"
+            )
+            
+            # Approve payment
+            print("\n4. Approving payment...")
+            escrow.approve_payment(
+                escrow_address=escrow_addr,
+                quality_score=0.85
+            )
         
-        print("\n✓ Demo complete! All escrow states recorded on Autonomi.")
+        if escrow.failed_updates:
+            print(f"\n⚠ Demo finished with {len(escrow.failed_updates)} update(s) not recorded.")
+        else:
+            print("\n✓ Demo complete! All escrow states recorded on Autonomi.")
     
     elif cmd == "list":
-        escrows = escrow.list_escrows()
-        print(f"Total escrows: {len(escrows)}")
-        for e in escrows:
+        total = escrow.db.execute("SELECT COUNT(*) FROM escrows").fetchone()[0]
+        print(f"Total escrows: {total}")
+        for e in escrow.iter_escrows():
             print(f"  [{e['state']}] {e['address'][:16]}... ({e['amount_ant']} ANT)")
     
     elif cmd == "get":
         addr = sys.argv[2]
         data = escrow.client.backend.get_data(addr)
-        print(json.dumps(data, indent=2))
+        print(dumps(data, indent=True).decode())
 
 
 if __name__ == "__main__":
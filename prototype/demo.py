@@ -16,32 +16,21 @@ Usage:
     python demo.py prompt "your text" # Custom prompt
 """
 
-import subprocess
 import sys
-import json
-import time
 from pathlib import Path
 
 # Add parent directory for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-PROTO_DIR = Path(__file__).parent
+# The demo drives each component in-process rather than spawning a shell and
+# a fresh interpreter per step
+import escrow
+import queue_simulator
+import smart_bidder
+from storage import dumps
 
-def run(cmd, show=True):
-    """Run a command and return output."""
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=PROTO_DIR)
-    output = result.stdout.strip()
-    if show and output:
-        print(output)
-    return output
-
-def run_json(cmd):
-    """Run command and parse JSON output."""
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=PROTO_DIR)
-    try:
-        return json.loads(result.stdout)
-    except:
-        return {}
+def show_balance(address: str):
+    print(f"{address}: {escrow.get_balance(address)} ANT")
 
 def separator():
     print("\n" + "="*60 + "\n")
@@ -74,9 +63,10 @@ def main():
     separator()
     print("📋 STEP 1: Fund Requester Wallet")
     print("-" * 40)
-    run("python escrow.py fund demo_alice 10.0")
+    balance = escrow.add_funds("demo_alice", 10.0)
+    print(f"New balance: {balance} ANT")
     print()
-    run("python escrow.py balance demo_alice")
+    show_balance("demo_alice")
     
     separator()
     print("📝 STEP 2: Create Request")
@@ -84,61 +74,54 @@ def main():
     print(f"Prompt: {prompt[:60]}...")
     print(f"Max price: {max_price} ANT")
     print()
-    output = run(f'python queue_simulator.py request "{prompt}" {max_price}')
-    
-    # Extract request ID
-    if "Created request:" in output:
-        request_id = output.split("Created request:")[1].strip()
-    else:
-        # Try to find it another way
-        import hashlib
-        request_id = f"req_{hashlib.sha256(prompt.encode()).hexdigest()[:12]}"
+    request_id = queue_simulator.create_request(prompt, max_price)["id"]
     
     print(f"\nRequest ID: {request_id}")
     
     separator()
     print("🔒 STEP 3: Lock Escrow")
     print("-" * 40)
-    run(f"python escrow.py create {request_id} demo_alice {max_price}")
+    escrow.create_escrow(request_id, "demo_alice", max_price)
     
     separator()
     print("🤖 STEP 4: Smart Bidder Analyzes & Bids")
     print("-" * 40)
     print("(Using real Devstral via Mistral API...)")
     print()
-    output = run("python smart_bidder.py once")
+    smart_bidder.daemon_tick()
     
     separator()
     print("🏆 STEP 5: Select Winner & Assign Escrow")
     print("-" * 40)
-    run(f"python queue_simulator.py select {request_id}")
+    queue_simulator.select_winner(request_id)
     # Get the winning bid price from the bidder status
-    run(f"python escrow.py assign {request_id} mellanrum-free-ai 0.015")
+    escrow.assign_escrow(request_id, "mellanrum-free-ai", 0.015)
     
     separator()
     print("⚡ STEP 6: Execute Inference")
     print("-" * 40)
     print("(Running real inference via Devstral API...)")
     print()
-    output = run("python smart_bidder.py once")
+    smart_bidder.daemon_tick()
     
     separator()
     print("📤 STEP 7: Submit Result & Complete Escrow")
     print("-" * 40)
-    run(f'python escrow.py submit {request_id} "result_hash_demo"')
-    run(f"python escrow.py approve {request_id}")
+    escrow.submit_result(request_id, "result_hash_demo")
+    escrow.approve_escrow(request_id)
     
     separator()
     print("📊 STEP 8: Final Status")
     print("-" * 40)
     print("\n🏦 Wallet Balances:")
-    run("python escrow.py balance demo_alice")
+    show_balance("demo_alice")
     print()
     print("⭐ Bidder Reputation:")
-    run("python smart_bidder.py status")
+    smart_bidder.print_status()
     print()
     print("📋 Escrow Record:")
-    run(f"python escrow.py status {request_id}")
+    record = escrow.get_escrow(request_id)
+    print(dumps(record, indent=True).decode() if record else "Not found")
     
     separator()
     print("""
@@ -8,10 +8,9 @@ This is the core component that turns a local GPU into an
 inference provider on the marketplace.
 """
 
-import json
 import time
-import subprocess
 import sys
+import requests
 from datetime import datetime
 from pathlib import Path
 
@@ -20,15 +19,15 @@ sys.path.insert(0, str(Path(__file__).parent))
 from queue_simulator import (
     list_open_requests,
     submit_bid,
-    get_bids_for_request,
     select_winner,
     submit_result,
-    get_request,
     load_json,
     save_json,
     QUEUE_FILE,
     BIDS_FILE
 )
+import ollama_client
+from ollama_client import DEFAULT_MAX_TOKENS
 
 # ═══════════════════════════════════════════════════════════════════
 # CONFIGURATION
@@ -40,34 +39,38 @@ CONFIG = {
     "min_price_ant": 0.05,         # Won't bid below this
     "max_price_ant": 1.0,          # Won't bid above this
     "bid_margin": 0.8,             # Bid at 80% of max price
-    "poll_interval_s": 5,          # Check queue every 5 seconds
+    "poll_interval_s": 5,          # Check queue at least every 5 seconds
+    "min_poll_interval_s": 0.25,   # Poll this fast right after activity
     "auto_bid": True,              # Automatically bid on matching requests
     "auto_process": True,          # Automatically process when winning
+    "ollama_url": "http://localhost:11434",
+    "ollama_model": "devstral",    # Ollama tag used for inference
+    "inference_timeout_s": 120,
+    "stream_inference": True,      # Stream tokens while processing won bids
 }
 
 # ═══════════════════════════════════════════════════════════════════
 # INFERENCE ENGINE
 # ═══════════════════════════════════════════════════════════════════
 
-def run_inference(prompt: str, max_tokens: int = 500) -> str:
-    """Run inference using local Devstral via Ollama."""
+def run_inference(prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                  stream: bool = False, on_chunk=None) -> str:
+    """Run inference using local Devstral via Ollama (see ollama_client.generate)."""
     try:
-        # Call Ollama with devstral model
-        result = subprocess.run(
-            ["ollama", "run", "devstral", prompt],
-            capture_output=True,
-            text=True,
-            timeout=120
+        response = ollama_client.generate(
+            prompt, CONFIG["ollama_model"], max_tokens,
+            stream=stream, on_chunk=on_chunk,
+            url=CONFIG["ollama_url"], timeout=CONFIG["inference_timeout_s"]
         )
-        if result.returncode == 0:
-            return result.stdout.strip()
+        if response is not None:
+            return response
         else:
             # Fallback for testing: simulate response
             return f"[Simulated response to: {prompt[:50]}...]"
-    except FileNotFoundError:
-        # Ollama not installed, simulate
+    except requests.ConnectionError:
+        # Ollama not running, simulate
         return f"[Simulated response to: {prompt[:50]}...]"
-    except subprocess.TimeoutExpired:
+    except requests.Timeout:
         return "[Error: Inference timeout]"
     except Exception as e:
         return f"[Error: {str(e)}]"
@@ -76,6 +79,19 @@ def run_inference(prompt: str, max_tokens: int = 500) -> str:
 # BIDDING LOGIC
 # ═══════════════════════════════════════════════════════════════════
 
+# Request ids we have already bid on; seeded from BIDS_FILE on first use
+# and kept up to date by daemon_tick, so should_bid never rescans bids
+_OUR_BIDDEN_REQUESTS = None
+
+def _our_bidden_requests() -> set:
+    global _OUR_BIDDEN_REQUESTS
+    if _OUR_BIDDEN_REQUESTS is None:
+        _OUR_BIDDEN_REQUESTS = {
+            bid["request_id"] for bid in load_json(BIDS_FILE)
+            if bid["bidder"]["address"] == CONFIG["bidder_address"]
+        }
+    return _OUR_BIDDEN_REQUESTS
+
 def should_bid(request: dict) -> bool:
     """Determine if we should bid on this request."""
     max_price = request["economics"]["max_price_ant"]
@@ -87,12 +103,7 @@ def should_bid(request: dict) -> bool:
         return False
     
     # Check if we already bid
-    bids = get_bids_for_request(request["id"])
-    for bid in bids:
-        if bid["bidder"]["address"] == CONFIG["bidder_address"]:
-            return False  # Already bid
-    
-    return True
+    return request["id"] not in _our_bidden_requests()
 
 def calculate_bid_price(request: dict) -> float:
     """Calculate optimal bid price."""
@@ -105,12 +116,22 @@ def process_winning_bid(request: dict, bid: dict):
     print(f"   Prompt: {request['request']['prompt'][:60]}...")
     
     # Run inference
+    started = time.monotonic()
+    first_token = []
+    
+    def on_chunk(text):
+        if not first_token:
+            first_token.append(time.monotonic() - started)
+            print(f"   First token after {first_token[0]:.2f}s")
+    
     response = run_inference(
         request["request"]["prompt"],
-        request["request"].get("max_tokens", 500)
+        request["request"].get("max_tokens", DEFAULT_MAX_TOKENS),
+        stream=CONFIG["stream_inference"],
+        on_chunk=on_chunk
     )
     
-    print(f"   Response: {response[:60]}...")
+    print(f"   Response: {response[:60]}... ({time.monotonic() - started:.1f}s)")
     
     # Submit result
     submit_result(request["id"], bid["id"], response)
@@ -120,31 +141,47 @@ def process_winning_bid(request: dict, bid: dict):
 # DAEMON LOOP
 # ═══════════════════════════════════════════════════════════════════
 
-def check_won_bids():
-    """Check if any of our bids have won and need processing."""
-    bids = load_json(BIDS_FILE)
+def check_won_bids(bids: list = None, requests_by_id: dict = None) -> int:
+    """Check if any of our bids have won and need processing.
     
-    for bid in bids:
-        if bid["bidder"]["address"] != CONFIG["bidder_address"]:
-            continue
-        if bid["status"] != "won":
-            continue
-        
+    daemon_tick passes in the bids and queue it already loaded this tick.
+    Returns the number of won bids processed.
+    """
+    if bids is None:
+        bids = load_json(BIDS_FILE)
+    if requests_by_id is None:
+        requests_by_id = {r["id"]: r for r in load_json(QUEUE_FILE)}
+    
+    if not CONFIG["auto_process"]:
+        return 0
+    
+    # One pass over all bids; only our won ones are looked at further
+    address = CONFIG["bidder_address"]
+    won = [b for b in bids if b["status"] == "won" and b["bidder"]["address"] == address]
+    
+    processed = 0
+    for bid in won:
         # Check if we already submitted result
-        request = get_request(bid["request_id"])
+        request = requests_by_id.get(bid["request_id"])
         if request and request.get("status") == "assigned":
             # We won and haven't processed yet
-            if CONFIG["auto_process"]:
-                process_winning_bid(request, bid)
+            process_winning_bid(request, bid)
+            processed += 1
+    return processed
 
-def daemon_tick():
-    """Single tick of the daemon loop."""
+def daemon_tick() -> int:
+    """Single tick of the daemon loop. Returns bids placed + jobs processed."""
     print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Checking queue...")
     
+    # Read each queue file once per tick and share it below
+    queue = load_json(QUEUE_FILE)
+    bids = load_json(BIDS_FILE)
+    
     # Get open requests
-    requests = list_open_requests()
+    requests = list_open_requests(queue)
     print(f"   Open requests: {len(requests)}")
     
+    activity = 0
     for req in requests:
         if should_bid(req):
             price = calculate_bid_price(req)
@@ -155,9 +192,12 @@ def daemon_tick():
                 CONFIG["model"],
                 CONFIG["bidder_address"]
             )
+            _our_bidden_requests().add(req["id"])
+            activity += 1
     
-    # Check for won bids
-    check_won_bids()
+    # Check for won bids (bids placed above are still pending)
+    activity += check_won_bids(bids, {r["id"]: r for r in queue})
+    return activity
 
 def run_daemon():
     """Run the bidder daemon."""
@@ -171,10 +211,19 @@ def run_daemon():
     print("=" * 60)
     print("Press Ctrl+C to stop\n")
     
+    idle_ticks = 0
     try:
         while True:
-            daemon_tick()
-            time.sleep(CONFIG["poll_interval_s"])
+            started = time.monotonic()
+            if daemon_tick():
+                idle_ticks = 0
+            else:
+                idle_ticks += 1
+            # Poll quickly during a burst, back off to poll_interval_s when
+            # idle; the tick's own duration counts against the interval
+            interval = min(CONFIG["poll_interval_s"],
+                           CONFIG["min_poll_interval_s"] * 2 ** min(idle_ticks, 16))
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
     except KeyboardInterrupt:
         print("\n\nDaemon stopped.")
 
@@ -1,18 +1,24 @@
 """
 AI-Market Escrow System
 
-Local file-based escrow implementation for testing.
+Local SQLite-backed escrow implementation for testing.
 Simulates trustless payment flow without real tokens.
 """
 
-import json
+import time
+import atexit
+import sqlite3
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, List
 from enum import Enum
+from contextlib import contextmanager, nullcontext
+
+from storage import dumps, loads, connect_db, cached_load, write_cached, file_lock
 
 # Escrow storage
-ESCROW_FILE = Path(__file__).parent / "queue" / "escrows.json"
+ESCROW_DB = Path(__file__).parent / "queue" / "escrows.db"
+ESCROW_FILE = Path(__file__).parent / "queue" / "escrows.json"  # pre-SQLite store, imported once
 
 # ═══════════════════════════════════════════════════════════════════
 # ESCROW STATES
@@ -37,35 +43,193 @@ TIMEOUTS = {
 # STORAGE
 # ═══════════════════════════════════════════════════════════════════
 
+# Record fields in order; history lives in its own table, one row per event
+ESCROW_COLUMNS = (
+    "request_id", "requester", "bidder", "amount_locked", "amount_paid", "state",
+    "created_at", "assigned_at", "submitted_at", "resolved_at",
+    "result_hash", "dispute_reason", "validator", "history", "updated_at",
+)
+STORED_COLUMNS = tuple(col for col in ESCROW_COLUMNS if col != "history")
+
+_db = None
+
+def _get_db() -> sqlite3.Connection:
+    """Shared connection; created (and the legacy JSON imported) on first use."""
+    global _db
+    if _db is None:
+        ESCROW_DB.parent.mkdir(parents=True, exist_ok=True)
+        _db = connect_db(ESCROW_DB)
+        # Writers take the lock up front, so read-check-update can't interleave
+        _db.isolation_level = "IMMEDIATE"
+        _db.execute("""
+            CREATE TABLE IF NOT EXISTS escrows (
+                request_id TEXT PRIMARY KEY,
+                requester TEXT,
+                bidder TEXT,
+                amount_locked REAL,
+                amount_paid REAL,
+                state TEXT,
+                created_at TEXT,
+                assigned_at TEXT,
+                submitted_at TEXT,
+                resolved_at TEXT,
+                result_hash TEXT,
+                dispute_reason TEXT,
+                validator TEXT,
+                updated_at TEXT
+            )
+        """)
+        _db.execute("""
+            CREATE TABLE IF NOT EXISTS escrow_history (
+                request_id TEXT NOT NULL,
+                ts TEXT,
+                action TEXT,
+                payload_json TEXT
+            )
+        """)
+        _db.execute("CREATE INDEX IF NOT EXISTS escrow_history_request "
+                    "ON escrow_history (request_id)")
+        _migrate_inline_history(_db)
+        _import_legacy_escrows(_db)
+    return _db
+
+# Set while batch() holds an open transaction
+_in_batch = False
+
+@contextmanager
+def batch():
+    """Group escrow mutations into one transaction (one commit, one WAL sync).
+    
+    Everything inside commits together when the block exits, or rolls back
+    together if it raises. Nested batch() calls join the outer one.
+    Wallet balances are a separate file and are not covered.
+    """
+    global _in_batch
+    if _in_batch:
+        yield
+        return
+    db = _get_db()
+    _in_batch = True
+    try:
+        with db:
+            yield
+    finally:
+        _in_batch = False
+
+def _transaction():
+    """Commit-on-exit context for a single mutation, unless batch() is open."""
+    return nullcontext() if _in_batch else _get_db()
+
+def _import_legacy_escrows(db: sqlite3.Connection):
+    """Copy escrows.json into an empty table (one-time migration)."""
+    if not ESCROW_FILE.exists():
+        return
+    if db.execute("SELECT 1 FROM escrows LIMIT 1").fetchone():
+        return
+    with db:
+        for escrow in loads(ESCROW_FILE.read_bytes()):
+            _insert_escrow(db, escrow, verb="INSERT OR IGNORE")
+
+def _migrate_inline_history(db: sqlite3.Connection):
+    """Move history kept as a JSON column (older schema) into escrow_history."""
+    columns = {row["name"] for row in db.execute("PRAGMA table_info(escrows)")}
+    if "history" not in columns:
+        return
+    rows = db.execute(
+        "SELECT request_id, history FROM escrows WHERE history IS NOT NULL"
+    ).fetchall()
+    if not rows:
+        return
+    with db:
+        for row in rows:
+            _insert_history(db, row["request_id"], loads(row["history"]))
+        db.execute("UPDATE escrows SET history = NULL")
+
+def _insert_history(db: sqlite3.Connection, request_id: str, events: List[Dict]):
+    db.executemany(
+        "INSERT INTO escrow_history (request_id, ts, action, payload_json) "
+        "VALUES (?, ?, ?, ?)",
+        [(request_id, event.get("time"), event.get("action"),
+          dumps({k: v for k, v in event.items() if k not in ("action", "time")},
+                default=str).decode())
+         for event in events]
+    )
+
+def _event_from_row(row: sqlite3.Row) -> Dict:
+    return {"action": row["action"], "time": row["ts"], **loads(row["payload_json"])}
+
+def _load_history(db: sqlite3.Connection, request_id: str) -> List[Dict]:
+    rows = db.execute(
+        "SELECT ts, action, payload_json FROM escrow_history "
+        "WHERE request_id = ? ORDER BY rowid", (request_id,)
+    )
+    return [_event_from_row(row) for row in rows]
+
+def _from_row(row: sqlite3.Row, history: List[Dict]) -> Dict:
+    escrow = {col: history if col == "history" else row[col] for col in ESCROW_COLUMNS}
+    if escrow["updated_at"] is None:
+        del escrow["updated_at"]  # never updated; matches the old record shape
+    return escrow
+
+def _insert_escrow(db: sqlite3.Connection, escrow: Dict, verb: str = "INSERT"):
+    db.execute(
+        f"{verb} INTO escrows ({', '.join(STORED_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(STORED_COLUMNS))})",
+        tuple(escrow.get(col) for col in STORED_COLUMNS)
+    )
+    if verb != "INSERT":
+        # Replacing (or re-importing) a record replaces its history too
+        db.execute("DELETE FROM escrow_history WHERE request_id = ?",
+                   (escrow["request_id"],))
+    _insert_history(db, escrow["request_id"], escrow.get("history", []))
+
 def load_escrows() -> List[Dict]:
-    """Load escrow data from file."""
-    if ESCROW_FILE.exists():
-        return json.loads(ESCROW_FILE.read_text())
-    return []
+    """Load all escrows."""
+    db = _get_db()
+    history = {}
+    for row in db.execute("SELECT * FROM escrow_history ORDER BY rowid"):
+        history.setdefault(row["request_id"], []).append(_event_from_row(row))
+    rows = db.execute("SELECT * FROM escrows ORDER BY rowid").fetchall()
+    return [_from_row(row, history.get(row["request_id"], [])) for row in rows]
 
 def save_escrows(escrows: List[Dict]):
-    """Save escrow data to file."""
-    ESCROW_FILE.parent.mkdir(parents=True, exist_ok=True)
-    ESCROW_FILE.write_text(json.dumps(escrows, indent=2, default=str))
+    """Write escrow records (upsert by request_id)."""
+    db = _get_db()
+    with _transaction():
+        for escrow in escrows:
+            _insert_escrow(db, escrow, verb="INSERT OR REPLACE")
 
 def get_escrow(request_id: str) -> Optional[Dict]:
     """Get escrow by request ID."""
-    escrows = load_escrows()
-    for e in escrows:
-        if e["request_id"] == request_id:
-            return e
-    return None
-
-def update_escrow(request_id: str, updates: Dict) -> bool:
-    """Update an escrow record."""
-    escrows = load_escrows()
-    for e in escrows:
-        if e["request_id"] == request_id:
-            e.update(updates)
-            e["updated_at"] = datetime.now().isoformat()
-            save_escrows(escrows)
-            return True
-    return False
+    db = _get_db()
+    row = db.execute(
+        "SELECT * FROM escrows WHERE request_id = ?", (request_id,)
+    ).fetchone()
+    return _from_row(row, _load_history(db, request_id)) if row else None
+
+def update_escrow(request_id: str, updates: Dict,
+                  history_append: Optional[Dict] = None) -> bool:
+    """Update an escrow record.
+    
+    history_append is one event to add to the escrow's history; it is
+    stored as a single new row, so the existing history is never rewritten.
+    """
+    updates = {**updates, "updated_at": datetime.now().isoformat()}
+    replace_history = updates.pop("history", None)
+    columns = ", ".join(f"{col} = ?" for col in updates)
+    db = _get_db()
+    with _transaction():
+        cur = db.execute(
+            f"UPDATE escrows SET {columns} WHERE request_id = ?",
+            (*updates.values(), request_id)
+        )
+        if cur.rowcount:
+            if replace_history is not None:
+                db.execute("DELETE FROM escrow_history WHERE request_id = ?", (request_id,))
+                _insert_history(db, request_id, replace_history)
+            if history_append is not None:
+                _insert_history(db, request_id, [history_append])
+    return cur.rowcount > 0
 
 # ═══════════════════════════════════════════════════════════════════
 # ESCROW OPERATIONS
@@ -78,13 +242,6 @@ def create_escrow(request_id: str, requester: str, max_price: float) -> Dict:
     Called when: Requester posts a new inference request.
     Effect: Funds locked until resolution.
     """
-    escrows = load_escrows()
-    
-    # Check if escrow already exists
-    for e in escrows:
-        if e["request_id"] == request_id:
-            raise ValueError(f"Escrow already exists for {request_id}")
-    
     escrow = {
         "request_id": request_id,
         "requester": requester,
@@ -104,12 +261,40 @@ def create_escrow(request_id: str, requester: str, max_price: float) -> Dict:
         ]
     }
     
-    escrows.append(escrow)
-    save_escrows(escrows)
+    db = _get_db()
+    try:
+        with _transaction():
+            _insert_escrow(db, escrow)
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Escrow already exists for {request_id}")
     
     print(f"💰 Escrow created: {max_price} ANT locked for {request_id}")
     return escrow
 
+def _mutate_escrow(request_id: str, expected_state: Optional[EscrowState], mutate) -> Dict:
+    """Check and update one escrow in a single read-modify-write.
+    
+    mutate(escrow) returns (updates, history_event). The read, the state
+    check and the write share one write transaction, so concurrent
+    transitions can't both pass the check. Returns the escrow as read
+    (without history) for the caller's report.
+    """
+    db = _get_db()
+    with _transaction():
+        if not db.in_transaction:
+            db.execute("BEGIN IMMEDIATE")  # take the write lock before reading
+        row = db.execute(
+            "SELECT * FROM escrows WHERE request_id = ?", (request_id,)
+        ).fetchone()
+        if not row:
+            raise ValueError(f"No escrow for {request_id}")
+        escrow = dict(row)
+        if expected_state and escrow["state"] != expected_state.value:
+            raise ValueError(f"Escrow not in {expected_state.value} state: {escrow['state']}")
+        updates, event = mutate(escrow)
+        update_escrow(request_id, updates, history_append=event)
+    return escrow
+
 def assign_escrow(request_id: str, bidder: str, bid_price: float) -> bool:
     """
     Assign escrow to winning bidder.
@@ -117,23 +302,13 @@ def assign_escrow(request_id: str, bidder: str, bid_price: float) -> bool:
     Called when: Winner is selected from bids.
     Effect: Work period begins, timeout starts.
     """
-    escrow = get_escrow(request_id)
-    if not escrow:
-        raise ValueError(f"No escrow for {request_id}")
-    
-    if escrow["state"] != EscrowState.CREATED.value:
-        raise ValueError(f"Escrow not in created state: {escrow['state']}")
-    
-    update_escrow(request_id, {
+    now = datetime.now().isoformat()
+    _mutate_escrow(request_id, EscrowState.CREATED, lambda escrow: ({
         "bidder": bidder,
         "amount_paid": bid_price,  # Will pay bid price, not max
         "state": EscrowState.ASSIGNED.value,
-        "assigned_at": datetime.now().isoformat(),
-        "history": escrow["history"] + [
-            {"action": "assigned", "time": datetime.now().isoformat(), 
-             "bidder": bidder, "price": bid_price}
-        ]
-    })
+        "assigned_at": now,
+    }, {"action": "assigned", "time": now, "bidder": bidder, "price": bid_price}))
     
     print(f"🎯 Escrow assigned: {bidder} at {bid_price} ANT")
     return True
@@ -145,22 +320,12 @@ def submit_result(request_id: str, result_hash: str) -> bool:
     Called when: Bidder submits inference result.
     Effect: Approval window begins.
     """
-    escrow = get_escrow(request_id)
-    if not escrow:
-        raise ValueError(f"No escrow for {request_id}")
-    
-    if escrow["state"] != EscrowState.ASSIGNED.value:
-        raise ValueError(f"Escrow not in assigned state: {escrow['state']}")
-    
-    update_escrow(request_id, {
+    now = datetime.now().isoformat()
+    _mutate_escrow(request_id, EscrowState.ASSIGNED, lambda escrow: ({
         "result_hash": result_hash,
         "state": EscrowState.SUBMITTED.value,
-        "submitted_at": datetime.now().isoformat(),
-        "history": escrow["history"] + [
-            {"action": "submitted", "time": datetime.now().isoformat(), 
-             "result_hash": result_hash}
-        ]
-    })
+        "submitted_at": now,
+    }, {"action": "submitted", "time": now, "result_hash": result_hash}))
     
     print(f"📤 Result submitted: {request_id}")
     return True
@@ -172,30 +337,25 @@ def approve_escrow(request_id: str) -> Dict:
     Called when: Requester is satisfied with result.
     Effect: Bidder receives payment, escrow closed.
     """
-    escrow = get_escrow(request_id)
-    if not escrow:
-        raise ValueError(f"No escrow for {request_id}")
-    
-    if escrow["state"] != EscrowState.SUBMITTED.value:
-        raise ValueError(f"Escrow not in submitted state: {escrow['state']}")
-    
+    now = datetime.now().isoformat()
+    
+    def approve(escrow):
+        payment = escrow["amount_paid"]
+        refund = escrow["amount_locked"] - payment  # Difference returned to requester
+        return {
+            "state": EscrowState.APPROVED.value,
+            "resolved_at": now,
+        }, {"action": "approved", "time": now,
+            "payment_to_bidder": payment, "refund_to_requester": refund}
+    
+    escrow = _mutate_escrow(request_id, EscrowState.SUBMITTED, approve)
     payment = escrow["amount_paid"]
-    refund = escrow["amount_locked"] - payment  # Difference returned to requester
-    
-    update_escrow(request_id, {
-        "state": EscrowState.APPROVED.value,
-        "resolved_at": datetime.now().isoformat(),
-        "history": escrow["history"] + [
-            {"action": "approved", "time": datetime.now().isoformat(),
-             "payment_to_bidder": payment, "refund_to_requester": refund}
-        ]
-    })
     
     print(f"✅ Escrow approved: {payment} ANT to {escrow['bidder']}")
     return {
         "bidder": escrow["bidder"],
         "payment": payment,
-        "refund": refund
+        "refund": escrow["amount_locked"] - payment
     }
 
 def dispute_escrow(request_id: str, reason: str) -> bool:
@@ -205,25 +365,15 @@ def dispute_escrow(request_id: str, reason: str) -> bool:
     Called when: Requester unsatisfied with result.
     Effect: Validator assigned, work paused.
     """
-    escrow = get_escrow(request_id)
-    if not escrow:
-        raise ValueError(f"No escrow for {request_id}")
-    
-    if escrow["state"] != EscrowState.SUBMITTED.value:
-        raise ValueError(f"Escrow not in submitted state: {escrow['state']}")
-    
     # In real system, validator would be randomly selected
     validator = "validator_001"  # Simulated
+    now = datetime.now().isoformat()
     
-    update_escrow(request_id, {
+    _mutate_escrow(request_id, EscrowState.SUBMITTED, lambda escrow: ({
         "state": EscrowState.DISPUTED.value,
         "dispute_reason": reason,
         "validator": validator,
-        "history": escrow["history"] + [
-            {"action": "disputed", "time": datetime.now().isoformat(),
-             "reason": reason, "validator": validator}
-        ]
-    })
+    }, {"action": "disputed", "time": now, "reason": reason, "validator": validator}))
     
     print(f"⚠️ Escrow disputed: {reason}")
     return True
@@ -236,39 +386,34 @@ def resolve_dispute(request_id: str, valid: bool) -> Dict:
     valid=True: Bidder was right, gets paid + dispute fee from requester
     valid=False: Requester was right, gets refund + bidder slashed
     """
-    escrow = get_escrow(request_id)
-    if not escrow:
-        raise ValueError(f"No escrow for {request_id}")
-    
-    if escrow["state"] != EscrowState.DISPUTED.value:
-        raise ValueError(f"Escrow not in disputed state: {escrow['state']}")
-    
-    if valid:
-        # Bidder was right
-        result = {
-            "decision": "valid",
-            "payment_to_bidder": escrow["amount_paid"],
-            "refund_to_requester": 0,
-            "penalty": "Requester pays dispute fee"
-        }
-        new_state = EscrowState.APPROVED.value
-    else:
-        # Requester was right
-        result = {
-            "decision": "invalid",
-            "payment_to_bidder": 0,
-            "refund_to_requester": escrow["amount_locked"],
-            "penalty": "Bidder reputation slashed"
-        }
-        new_state = EscrowState.REFUNDED.value
-    
-    update_escrow(request_id, {
-        "state": new_state,
-        "resolved_at": datetime.now().isoformat(),
-        "history": escrow["history"] + [
-            {"action": "resolved", "time": datetime.now().isoformat(), **result}
-        ]
-    })
+    now = datetime.now().isoformat()
+    result = {}
+    
+    def resolve(escrow):
+        if valid:
+            # Bidder was right
+            result.update({
+                "decision": "valid",
+                "payment_to_bidder": escrow["amount_paid"],
+                "refund_to_requester": 0,
+                "penalty": "Requester pays dispute fee"
+            })
+            new_state = EscrowState.APPROVED.value
+        else:
+            # Requester was right
+            result.update({
+                "decision": "invalid",
+                "payment_to_bidder": 0,
+                "refund_to_requester": escrow["amount_locked"],
+                "penalty": "Bidder reputation slashed"
+            })
+            new_state = EscrowState.REFUNDED.value
+        return {
+            "state": new_state,
+            "resolved_at": now,
+        }, {"action": "resolved", "time": now, **result}
+    
+    _mutate_escrow(request_id, EscrowState.DISPUTED, resolve)
     
     print(f"⚖️ Dispute resolved: {result['decision']}")
     return result
@@ -280,21 +425,14 @@ def refund_escrow(request_id: str, reason: str = "cancelled") -> float:
     Called when: Request expires, bidder fails, or cancelled.
     Effect: Full refund to requester.
     """
-    escrow = get_escrow(request_id)
-    if not escrow:
-        raise ValueError(f"No escrow for {request_id}")
-    
-    refund = escrow["amount_locked"]
-    
-    update_escrow(request_id, {
+    now = datetime.now().isoformat()
+    escrow = _mutate_escrow(request_id, None, lambda escrow: ({
         "state": EscrowState.REFUNDED.value,
-        "resolved_at": datetime.now().isoformat(),
-        "history": escrow["history"] + [
-            {"action": "refunded", "time": datetime.now().isoformat(),
-             "reason": reason, "amount": refund}
-        ]
-    })
+        "resolved_at": now,
+    }, {"action": "refunded", "time": now,
+        "reason": reason, "amount": escrow["amount_locked"]}))
     
+    refund = escrow["amount_locked"]
     print(f"↩️ Escrow refunded: {refund} ANT to {escrow['requester']}")
     return refund
 
@@ -302,18 +440,92 @@ def refund_escrow(request_id: str, reason: str = "cancelled") -> float:
 # WALLET SIMULATION
 # ═══════════════════════════════════════════════════════════════════
 
-WALLETS_FILE = Path(__file__).parent / "queue" / "wallets.json"
+WALLETS_FILE = Path(__file__).parent / "queue" / "wallets.json"  # compacted snapshot
+WALLETS_LOG = Path(__file__).parent / "queue" / "wallets.log"    # deltas since snapshot
+
+# Fold the log into the snapshot after this many logged mutations
+WALLET_COMPACT_EVERY = 1000
+
+# In-memory replay of snapshot + log, advanced incrementally
+_wallet_state = {"snapshot": None, "balances": {}, "offset": 0, "entries": 0}
+
+# The snapshot is {"gen": n, "balances": {...}} and each log line carries
+# the gen it was written against. Compaction bumps gen before emptying the
+# log, so if it dies in between, replay skips the already-folded lines.
+# A bare {address: balance} snapshot (older files) is gen 0.
+def _snapshot_parts(snapshot: dict):
+    if "balances" in snapshot and "gen" in snapshot:
+        return snapshot["gen"], snapshot["balances"]
+    return 0, snapshot
+
+def _replay_wallets() -> Dict[str, float]:
+    """Current balances: the snapshot plus every logged delta.
+    
+    Only log bytes not seen on a previous call are read. Call with
+    file_lock(WALLETS_FILE) held, so a compaction can't run mid-replay.
+    """
+    state = _wallet_state
+    snapshot = cached_load(WALLETS_FILE, dict)
+    gen, folded = _snapshot_parts(snapshot)
+    if state["snapshot"] is not snapshot:  # first use, or compacted since
+        state.update(snapshot=snapshot, balances=dict(folded), offset=0, entries=0)
+    try:
+        with open(WALLETS_LOG, "rb") as f:
+            f.seek(state["offset"])
+            new = f.read()
+    except FileNotFoundError:
+        new = b""
+    end = new.rfind(b"\n") + 1  # ignore a line still being written
+    balances = state["balances"]
+    for line in new[:end].splitlines():
+        entry = loads(line)
+        if entry.get("g", 0) < gen:
+            continue  # already in the snapshot (compaction cut short)
+        for address, delta in entry["d"].items():
+            balances[address] = balances.get(address, 0.0) + delta
+        state["entries"] += 1
+    state["offset"] += end
+    return balances
+
+def _log_wallet_deltas(deltas: Dict[str, float]):
+    """Append one mutation to the log and apply it (lock held, state replayed)."""
+    gen, _ = _snapshot_parts(_wallet_state["snapshot"] or {})
+    line = dumps({"t": time.time(), "g": gen, "d": deltas}) + b"\n"
+    with open(WALLETS_LOG, "ab") as f:
+        f.write(line)
+    state = _wallet_state
+    for address, delta in deltas.items():
+        state["balances"][address] = state["balances"].get(address, 0.0) + delta
+    state["offset"] += len(line)
+    state["entries"] += 1
+    if state["entries"] >= WALLET_COMPACT_EVERY:
+        _compact_wallets(state["balances"])
+
+def _compact_wallets(balances: Dict[str, float]):
+    """Write balances as the new snapshot and empty the log (lock held)."""
+    gen, _ = _snapshot_parts(_wallet_state["snapshot"] or cached_load(WALLETS_FILE, dict))
+    snapshot = {"gen": gen + 1, "balances": dict(balances)}
+    write_cached(WALLETS_FILE, dumps(snapshot), snapshot)
+    open(WALLETS_LOG, "wb").close()
+    _wallet_state.update(snapshot=snapshot, balances=dict(balances), offset=0, entries=0)
+
+@atexit.register
+def _compact_on_exit():
+    if _wallet_state["entries"]:
+        with file_lock(WALLETS_FILE):
+            _compact_wallets(_replay_wallets())
 
 def load_wallets() -> Dict[str, float]:
-    """Load wallet balances."""
-    if WALLETS_FILE.exists():
-        return json.loads(WALLETS_FILE.read_text())
-    return {}
+    """Load wallet balances (shared and read-only; change them via add_funds/transfer)."""
+    with file_lock(WALLETS_FILE):
+        return _replay_wallets()
 
 def save_wallets(wallets: Dict[str, float]):
-    """Save wallet balances."""
+    """Replace all wallet balances (writes a fresh snapshot)."""
     WALLETS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    WALLETS_FILE.write_text(json.dumps(wallets, indent=2))
+    with file_lock(WALLETS_FILE):
+        _replay_wallets()  # pick up the current log offset before truncating it
+        _compact_wallets(wallets)
 
 def get_balance(address: str) -> float:
     """Get wallet balance."""
@@ -322,22 +534,23 @@ def get_balance(address: str) -> float:
 
 def add_funds(address: str, amount: float) -> float:
     """Add funds to wallet (faucet/deposit)."""
-    wallets = load_wallets()
-    wallets[address] = wallets.get(address, 0.0) + amount
-    save_wallets(wallets)
-    return wallets[address]
+    with file_lock(WALLETS_FILE):
+        _replay_wallets()
+        _log_wallet_deltas({address: amount})
+        return _wallet_state["balances"][address]
 
 def transfer(from_addr: str, to_addr: str, amount: float) -> bool:
     """Transfer funds between wallets."""
-    wallets = load_wallets()
-    
-    from_balance = wallets.get(from_addr, 0.0)
-    if from_balance < amount:
-        raise ValueError(f"Insufficient funds: {from_balance} < {amount}")
-    
-    wallets[from_addr] = from_balance - amount
-    wallets[to_addr] = wallets.get(to_addr, 0.0) + amount
-    save_wallets(wallets)
+    with file_lock(WALLETS_FILE):
+        wallets = _replay_wallets()
+        
+        from_balance = wallets.get(from_addr, 0.0)
+        if from_balance < amount:
+            raise ValueError(f"Insufficient funds: {from_balance} < {amount}")
+        
+        deltas = {from_addr: -amount}
+        deltas[to_addr] = deltas.get(to_addr, 0.0) + amount
+        _log_wallet_deltas(deltas)
     
     return True
 
@@ -345,45 +558,28 @@ def transfer(from_addr: str, to_addr: str, amount: float) -> bool:
 # CLI
 # ═══════════════════════════════════════════════════════════════════
 
-def main():
-    import sys
-    
-    if len(sys.argv) < 2:
-        print("Usage: python escrow.py <command>")
-        print("Commands:")
-        print("  create <request_id> <requester> <amount>")
-        print("  assign <request_id> <bidder> <price>")
-        print("  submit <request_id> <result_hash>")
-        print("  approve <request_id>")
-        print("  dispute <request_id> <reason>")
-        print("  resolve <request_id> <valid|invalid>")
-        print("  refund <request_id>")
-        print("  status <request_id>")
-        print("  list")
-        print("  balance <address>")
-        print("  fund <address> <amount>")
-        return
-    
-    cmd = sys.argv[1]
+def run_command(args: List[str]):
+    """Run one CLI command; args = [command, *arguments]."""
+    cmd = args[0]
     
     if cmd == "create":
-        create_escrow(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        create_escrow(args[1], args[2], float(args[3]))
     elif cmd == "assign":
-        assign_escrow(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        assign_escrow(args[1], args[2], float(args[3]))
     elif cmd == "submit":
-        submit_result(sys.argv[2], sys.argv[3])
+        submit_result(args[1], args[2])
     elif cmd == "approve":
-        approve_escrow(sys.argv[2])
+        approve_escrow(args[1])
     elif cmd == "dispute":
-        dispute_escrow(sys.argv[2], " ".join(sys.argv[3:]))
+        dispute_escrow(args[1], " ".join(args[2:]))
     elif cmd == "resolve":
-        resolve_dispute(sys.argv[2], sys.argv[3] == "valid")
+        resolve_dispute(args[1], args[2] == "valid")
     elif cmd == "refund":
-        refund_escrow(sys.argv[2])
+        refund_escrow(args[1])
     elif cmd == "status":
-        escrow = get_escrow(sys.argv[2])
+        escrow = get_escrow(args[1])
         if escrow:
-            print(json.dumps(escrow, indent=2))
+            print(dumps(escrow, indent=True).decode())
         else:
             print("Not found")
     elif cmd == "list":
@@ -391,12 +587,54 @@ def main():
         for e in escrows:
             print(f"{e['request_id']}: {e['state']} - {e['amount_locked']} ANT")
     elif cmd == "balance":
-        print(f"{sys.argv[2]}: {get_balance(sys.argv[2])} ANT")
+        print(f"{args[1]}: {get_balance(args[1])} ANT")
     elif cmd == "fund":
-        balance = add_funds(sys.argv[2], float(sys.argv[3]))
+        balance = add_funds(args[1], float(args[2]))
         print(f"New balance: {balance} ANT")
     else:
         print(f"Unknown command: {cmd}")
 
+def main():
+    import sys
+    import shlex
+    
+    if len(sys.argv) < 2:
+        print("Usage: python escrow.py <command>")
+        print("Commands:")
+        print("  create <request_id> <requester> <amount>")
+        print("  assign <request_id> <bidder> <price>")
+        print("  submit <request_id> <result_hash>")
+        print("  approve <request_id>")
+        print("  dispute <request_id> <reason>")
+        print("  resolve <request_id> <valid|invalid>")
+        print("  refund <request_id>")
+        print("  status <request_id>")
+        print("  list")
+        print("  balance <address>")
+        print("  fund <address> <amount>")
+        print("  batch              - Read commands from stdin, commit once")
+        return
+    
+    if sys.argv[1] == "batch":
+        # All escrow changes land in one transaction; any failure rolls
+        # them back (wallet balances are not covered; see batch())
+        count = 0
+        lineno, line = 0, ""
+        try:
+            with batch():
+                for lineno, line in enumerate(sys.stdin, 1):
+                    args = shlex.split(line, comments=True)
+                    if args:
+                        run_command(args)
+                        count += 1
+        except (ValueError, IndexError, KeyError) as e:
+            print(f"Batch aborted at line {lineno} ({line.strip()!r}) after {count} commands, "
+                  f"no escrow changes committed: {e!r}")
+            sys.exit(1)
+        print(f"✓ Batch committed: {count} commands")
+        return
+    
+    run_command(sys.argv[1:])
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,69 @@
+"""
+AI-Market Ollama Client
+
+Shared HTTP client for a local Ollama server. One keep-alive session per
+process, so the model stays loaded between prompts and no process is
+spawned per inference.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import requests
+
+from storage import loads
+
+OLLAMA_URL = "http://localhost:11434"
+DEFAULT_MAX_TOKENS = 500
+KEEP_ALIVE = "10m"  # how long Ollama keeps the model loaded after a call
+
+_SESSION = requests.Session()
+
+@lru_cache(maxsize=64)
+def _options(max_tokens: int) -> dict:
+    # Shared per max_tokens value; never mutated
+    return {"num_predict": max_tokens}
+
+def _read_stream(resp, on_chunk=None) -> str:
+    """Collect an Ollama NDJSON stream, calling on_chunk(text) per piece."""
+    parts = []
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        chunk = loads(line)
+        text = chunk.get("response", "")
+        if text:
+            parts.append(text)
+            if on_chunk:
+                on_chunk(text)
+        if chunk.get("done"):
+            break
+    return "".join(parts)
+
+def generate(prompt: str, model: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+             stream: bool = False, on_chunk=None, url: str = OLLAMA_URL,
+             timeout: float = 120) -> Optional[str]:
+    """Run one generation. Returns the stripped text, or None on a non-200.
+    
+    With stream=True tokens are read as they are generated (on_chunk is
+    called with each piece), and the timeout applies between chunks
+    rather than to the whole generation. Connection errors and timeouts
+    are raised as requests exceptions for the caller's fallback.
+    """
+    resp = _SESSION.post(
+        f"{url}/api/generate",
+        json={
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": KEEP_ALIVE,
+            "options": _options(max_tokens)
+        },
+        timeout=timeout,
+        stream=stream
+    )
+    if resp.status_code != 200:
+        return None
+    if stream:
+        return _read_stream(resp, on_chunk).strip()
+    return resp.json()["response"].strip()
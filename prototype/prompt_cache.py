@@ -0,0 +1,171 @@
+"""
+AI-Market Prompt Cache
+
+Response cache in front of run_inference, so repeated (or near-identical)
+prompts don't pay for a fresh Devstral call.
+
+Two layers:
+- exact: SQLite row per (prompt_hash, model, max_tokens) -> response
+- semantic: FAISS inner-product index over sentence-transformer embeddings,
+  only enabled when faiss + sentence-transformers are installed
+"""
+
+import os
+import atexit
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict
+
+from storage import connect_db
+
+# Optional semantic layer
+try:
+    import numpy as np
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    HAS_SEMANTIC = True
+except ImportError:
+    HAS_SEMANTIC = False
+
+CACHE_DIR = Path(__file__).parent / "data"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Nearest neighbours checked per semantic lookup: the index spans every
+# model, so the closest hit may belong to another (model, max_tokens)
+SEMANTIC_SEARCH_K = 5
+
+# The FAISS index is rewritten after this many inserts, and at exit
+INDEX_SAVE_EVERY = 50
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form used for the exact-match key."""
+    return " ".join(prompt.lower().split())
+
+
+def is_cacheable(response: str) -> bool:
+    """Never cache simulated or failed inference."""
+    return bool(response) and not response.startswith(("[Simulated", "[Error"))
+
+
+class PromptCache:
+    """Caches inference responses keyed by prompt, model and max_tokens."""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, similarity_threshold: float = 0.92):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.similarity_threshold = similarity_threshold
+
+        # Shared by the bidder's worker threads; the lock serializes access
+        self.db = connect_db(cache_dir / "prompt_cache.db", check_same_thread=False)
+        self._lock = threading.Lock()
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                max_tokens INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                quality REAL,
+                created TEXT,
+                UNIQUE (prompt_hash, model, max_tokens)
+            )
+        """)
+
+        self.index_path = cache_dir / "prompt_cache.faiss"
+        self.encoder = None
+        self.index = None
+        if HAS_SEMANTIC:
+            self.encoder = SentenceTransformer(EMBEDDING_MODEL)
+            if self.index_path.exists():
+                self.index = faiss.read_index(str(self.index_path))
+            else:
+                dim = self.encoder.get_sentence_embedding_dimension()
+                self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            self._unsaved = 0  # inserts since the index was last written
+            atexit.register(self.flush)
+
+    def _embed(self, prompt: str):
+        # Normalized embeddings make inner product == cosine similarity
+        vec = self.encoder.encode([prompt], normalize_embeddings=True)
+        return np.asarray(vec, dtype="float32")
+
+    def lookup(self, prompt: str, model: str, max_tokens: int) -> Optional[Dict]:
+        """Return {"response", "quality"} for a cached prompt, or None."""
+        with self._lock:
+            return self._lookup(prompt, model, max_tokens)
+
+    def _lookup(self, prompt: str, model: str, max_tokens: int) -> Optional[Dict]:
+        prompt_hash = hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest()
+        row = self.db.execute(
+            "SELECT response, quality FROM responses "
+            "WHERE prompt_hash = ? AND model = ? AND max_tokens = ?",
+            (prompt_hash, model, max_tokens)
+        ).fetchone()
+        if row:
+            return dict(row)
+
+        if self.index is None or self.index.ntotal == 0:
+            return None
+
+        scores, ids = self.index.search(self._embed(prompt), SEMANTIC_SEARCH_K)
+        candidates = [int(i) for score, i in zip(scores[0], ids[0])
+                      if i != -1 and score >= self.similarity_threshold]
+        if not candidates:
+            return None
+
+        # Nearest candidate that was generated with this model and budget
+        rows = self.db.execute(
+            "SELECT id, response, quality FROM responses "
+            f"WHERE id IN ({', '.join('?' * len(candidates))}) "
+            "AND model = ? AND max_tokens = ?",
+            (*candidates, model, max_tokens)
+        ).fetchall()
+        by_id = {row["id"]: row for row in rows}
+        for i in candidates:
+            if i in by_id:
+                return {"response": by_id[i]["response"], "quality": by_id[i]["quality"]}
+        return None
+
+    def store(self, prompt: str, model: str, max_tokens: int,
+              response: str, quality: float):
+        """Remember a response for future lookups."""
+        if not is_cacheable(response):
+            return
+        with self._lock:
+            self._store(prompt, model, max_tokens, response, quality)
+
+    def _store(self, prompt: str, model: str, max_tokens: int,
+               response: str, quality: float):
+        prompt_hash = hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest()
+        with self.db:
+            cur = self.db.execute(
+                "INSERT OR IGNORE INTO responses "
+                "(prompt_hash, model, max_tokens, response, quality, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (prompt_hash, model, max_tokens, response, quality,
+                 datetime.now().isoformat())
+            )
+
+        if self.index is not None and cur.rowcount:
+            self.index.add_with_ids(self._embed(prompt), np.array([cur.lastrowid], dtype="int64"))
+            self._unsaved += 1
+            if self._unsaved >= INDEX_SAVE_EVERY:
+                self._save_index()
+
+    def flush(self):
+        """Write the semantic index if it has unsaved inserts."""
+        if self.index is None:
+            return
+        with self._lock:
+            if self._unsaved:
+                self._save_index()
+
+    def _save_index(self):
+        # Rows inserted since the last save simply miss the semantic layer
+        # after a crash; the exact layer still has them
+        tmp = f"{self.index_path}.tmp"
+        faiss.write_index(self.index, tmp)
+        os.replace(tmp, self.index_path)
+        self._unsaved = 0
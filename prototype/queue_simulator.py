@@ -5,34 +5,79 @@ A local simulation of the inference marketplace queue.
 Uses file-based storage to simulate Autonomi's Scratchpad/Pointer.
 """
 
-import json
+import time
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, List, Dict
 
+from storage import dumps, cached_load, cached_index, write_cached, file_lock
+
 # Paths
 MARKET_DIR = Path(__file__).resolve().parent
 QUEUE_FILE = MARKET_DIR / "queue" / "requests.json"
 BIDS_FILE = MARKET_DIR / "queue" / "bids.json"
 RESULTS_FILE = MARKET_DIR / "queue" / "results.json"
 
+_dirs_ready = False
+
 def ensure_dirs():
-    """Create queue directory if needed."""
+    """Create queue directory if needed (checked once per process).
+    
+    Missing files load as empty lists anyway, so nothing breaks if they
+    are deleted later; the next save recreates them.
+    """
+    global _dirs_ready
+    if _dirs_ready:
+        return
     (MARKET_DIR / "queue").mkdir(exist_ok=True)
     for f in [QUEUE_FILE, BIDS_FILE, RESULTS_FILE]:
         if not f.exists():
             f.write_text("[]")
+    _dirs_ready = True
 
 def load_json(path: Path) -> list:
-    """Load JSON array from file."""
-    if path.exists():
-        return json.loads(path.read_text())
-    return []
+    """Load JSON array from file (cached until the file changes; see storage.cached_load)."""
+    return cached_load(path, list)
+
+# Last-written JSON text of each record, per file: id -> (record, text).
+# Text is only reused for the very same record object, so a re-parse of
+# the file (new objects) can never pick up stale fragments.
+_FRAGMENTS = {}
+
+
+def save_json(path: Path, data: list, dirty=None):
+    """Save JSON array to file (compact, one record per line).
+    
+    dirty is the set of ids of existing records changed since the last
+    save; other records reuse their serialized text (new records are always
+    serialized). dirty=None re-serializes everything.
+    """
+    previous = _FRAGMENTS.get(path, {})
+    fragments = {}
+    parts = []
+    for record in data:
+        rid = record.get("id")
+        cached = previous.get(rid)
+        if dirty is None or rid in dirty or cached is None or cached[0] is not record:
+            cached = (record, dumps(record))
+        fragments[rid] = cached
+        parts.append(cached[1])
+    write_cached(path, b"[\n" + b",\n".join(parts) + b"\n]" if parts else b"[]", data)
+    _FRAGMENTS[path] = fragments
+
+# Derived indexes over the cached files (rebuilt only when a file changes)
+def _by_id(records: list) -> Dict[str, dict]:
+    return {r["id"]: r for r in records}
 
-def save_json(path: Path, data: list):
-    """Save JSON array to file."""
-    path.write_text(json.dumps(data, indent=2))
+def _open_requests(queue: list) -> List[dict]:
+    return [r for r in queue if r.get("status") == "open"]
+
+def _by_request(bids: list) -> Dict[str, List[dict]]:
+    grouped = {}
+    for b in bids:
+        grouped.setdefault(b["request_id"], []).append(b)
+    return grouped
 
 # ═══════════════════════════════════════════════════════════════════
 # REQUEST MANAGEMENT
@@ -49,12 +94,15 @@ def create_request(
     """Create a new inference request."""
     ensure_dirs()
     
+    now = datetime.now()
+    expires = now + timedelta(minutes=expires_minutes)
     request = {
         "id": f"req_{uuid.uuid4().hex[:12]}",
         "type": "inference_request",
         "status": "open",
-        "created": datetime.now().isoformat(),
-        "expires": (datetime.now() + timedelta(minutes=expires_minutes)).isoformat(),
+        "created": now.isoformat(),
+        "expires": expires.isoformat(),
+        "expires_epoch": int(expires.timestamp()),  # for cheap expiry checks
         "request": {
             "prompt": prompt,
             "model_hint": model_hint,
@@ -71,34 +119,37 @@ def create_request(
     }
     
     # Add to queue
-    queue = load_json(QUEUE_FILE)
-    queue.append(request)
-    save_json(QUEUE_FILE, queue)
+    with file_lock(QUEUE_FILE):
+        queue = load_json(QUEUE_FILE)
+        queue.append(request)
+        save_json(QUEUE_FILE, queue, dirty=())
     
     print(f"✓ Created request: {request['id']}")
     return request
 
-def list_open_requests() -> List[dict]:
-    """List all open requests."""
+def list_open_requests(queue: Optional[list] = None) -> List[dict]:
+    """List all open requests (from `queue` if the caller already loaded it)."""
     ensure_dirs()
-    queue = load_json(QUEUE_FILE)
-    now = datetime.now()
+    if queue is None:
+        # Status filter is memoized per change of the queue file
+        _, candidates = cached_index(QUEUE_FILE, "open", _open_requests, list)
+    else:
+        candidates = _open_requests(queue)
+    now = time.time()
     
     open_reqs = []
-    for req in queue:
-        if req.get("status") == "open":
-            expires = datetime.fromisoformat(req["expires"])
-            if expires > now:
-                open_reqs.append(req)
+    for req in candidates:
+        expires = req.get("expires_epoch")
+        if expires is None:  # created before expires_epoch was recorded
+            expires = datetime.fromisoformat(req["expires"]).timestamp()
+        if expires > now:
+            open_reqs.append(req)
     return open_reqs
 
 def get_request(request_id: str) -> Optional[dict]:
     """Get a specific request by ID."""
-    queue = load_json(QUEUE_FILE)
-    for req in queue:
-        if req["id"] == request_id:
-            return req
-    return None
+    _, requests_by_id = cached_index(QUEUE_FILE, "by_id", _by_id, list)
+    return requests_by_id.get(request_id)
 
 # ═══════════════════════════════════════════════════════════════════
 # BID MANAGEMENT
@@ -129,46 +180,46 @@ def submit_bid(
         "status": "pending"
     }
     
-    bids = load_json(BIDS_FILE)
-    bids.append(bid)
-    save_json(BIDS_FILE, bids)
+    with file_lock(BIDS_FILE):
+        bids = load_json(BIDS_FILE)
+        bids.append(bid)
+        save_json(BIDS_FILE, bids, dirty=())
     
     print(f"✓ Submitted bid: {bid['id']} for {request_id} at {price_ant} ANT")
     return bid
 
 def get_bids_for_request(request_id: str) -> List[dict]:
     """Get all bids for a request."""
-    bids = load_json(BIDS_FILE)
-    return [b for b in bids if b["request_id"] == request_id]
+    _, bids_by_request = cached_index(BIDS_FILE, "by_request", _by_request, list)
+    return list(bids_by_request.get(request_id, ()))
 
 def select_winner(request_id: str) -> Optional[dict]:
     """Select winning bid (lowest price with reputation > 0.7)."""
-    bids = get_bids_for_request(request_id)
-    eligible = [b for b in bids if b["bidder"]["reputation"] > 0.7 and b["status"] == "pending"]
-    
-    if not eligible:
-        return None
-    
-    # Sort by price (lowest first)
-    eligible.sort(key=lambda b: b["bid"]["price_ant"])
-    winner = eligible[0]
-    
-    # Update bid status
-    all_bids = load_json(BIDS_FILE)
-    for b in all_bids:
-        if b["id"] == winner["id"]:
-            b["status"] = "won"
-        elif b["request_id"] == request_id:
-            b["status"] = "lost"
-    save_json(BIDS_FILE, all_bids)
+    # Held across pick and save, so two selectors can't both pick a winner
+    with file_lock(BIDS_FILE):
+        all_bids, bids_by_request = cached_index(BIDS_FILE, "by_request", _by_request, list)
+        bids = bids_by_request.get(request_id, [])
+        eligible = [b for b in bids if b["bidder"]["reputation"] > 0.7 and b["status"] == "pending"]
+        
+        if not eligible:
+            return None
+        
+        # Lowest price wins (first submitted on ties)
+        winner = min(eligible, key=lambda b: b["bid"]["price_ant"])
+        
+        # Update bid status (index entries are the records in all_bids)
+        for b in bids:
+            b["status"] = "won" if b is winner else "lost"
+        save_json(BIDS_FILE, all_bids, dirty={b["id"] for b in bids})
     
     # Update request status
-    queue = load_json(QUEUE_FILE)
-    for req in queue:
-        if req["id"] == request_id:
+    with file_lock(QUEUE_FILE):
+        queue, requests_by_id = cached_index(QUEUE_FILE, "by_id", _by_id, list)
+        req = requests_by_id.get(request_id)
+        if req:
             req["status"] = "assigned"
             req["assigned_to"] = winner["id"]
-    save_json(QUEUE_FILE, queue)
+        save_json(QUEUE_FILE, queue, dirty={request_id})
     
     print(f"✓ Winner selected: {winner['id']} at {winner['bid']['price_ant']} ANT")
     return winner
@@ -191,32 +242,35 @@ def submit_result(request_id: str, bid_id: str, response: str) -> dict:
         "paid": False
     }
     
-    results = load_json(RESULTS_FILE)
-    results.append(result)
-    save_json(RESULTS_FILE, results)
+    with file_lock(RESULTS_FILE):
+        results = load_json(RESULTS_FILE)
+        results.append(result)
+        save_json(RESULTS_FILE, results, dirty=())
     
     # Update request status
-    queue = load_json(QUEUE_FILE)
-    for req in queue:
-        if req["id"] == request_id:
+    with file_lock(QUEUE_FILE):
+        queue, requests_by_id = cached_index(QUEUE_FILE, "by_id", _by_id, list)
+        req = requests_by_id.get(request_id)
+        if req:
             req["status"] = "completed"
-    save_json(QUEUE_FILE, queue)
+        save_json(QUEUE_FILE, queue, dirty={request_id})
     
     print(f"✓ Result submitted for {request_id}")
     return result
 
 def validate_result(result_id: str, approved: bool) -> dict:
     """Validate a result (approve or reject)."""
-    results = load_json(RESULTS_FILE)
-    for res in results:
-        if res["id"] == result_id:
-            res["validated"] = approved
-            res["paid"] = approved
-            save_json(RESULTS_FILE, results)
-            status = "approved" if approved else "rejected"
-            print(f"✓ Result {result_id} {status}")
-            return res
-    return {}
+    with file_lock(RESULTS_FILE):
+        results, results_by_id = cached_index(RESULTS_FILE, "by_id", _by_id, list)
+        res = results_by_id.get(result_id)
+        if not res:
+            return {}
+        res["validated"] = approved
+        res["paid"] = approved
+        save_json(RESULTS_FILE, results, dirty={result_id})
+    status = "approved" if approved else "rejected"
+    print(f"✓ Result {result_id} {status}")
+    return res
 
 # ═══════════════════════════════════════════════════════════════════
 # CLI
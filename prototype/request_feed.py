@@ -5,37 +5,46 @@ Manages a feed of open requests that bidders can watch.
 Uses pointers to maintain a mutable "current requests" list.
 """
 
-import json
 import hashlib
+import threading
 from datetime import datetime
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 from pathlib import Path
 
-from autonomi_client import AutonomiClient
+from autonomi_client import get_client
+from storage import dumps, cached_load, cached_index, write_cached, file_lock
 
 # Feed configuration
 FEED_NAME = "ai_market_requests_v1"
 FEED_POINTER_FILE = Path(__file__).parent / "data" / "feed_pointer.json"
 
+def _entries_by_request_id(feed: dict) -> Dict[str, List[dict]]:
+    grouped = {}
+    for entry in feed["requests"]:
+        grouped.setdefault(entry["request_id"], []).append(entry)
+    return grouped
+
 class RequestFeed:
     """Manages the request feed on Autonomi."""
     
     def __init__(self, backend: str = "anttp"):
-        self.client = AutonomiClient(backend=backend)
+        self.client = get_client(backend)
         self._ensure_data_dir()
+        # request_id -> field updates, while transaction() is open
+        self._pending: Optional[Dict[str, dict]] = None
+        self._pending_lock = threading.Lock()
     
     def _ensure_data_dir(self):
         FEED_POINTER_FILE.parent.mkdir(parents=True, exist_ok=True)
     
     def _load_feed_pointer(self) -> dict:
-        """Load the local cache of feed pointer."""
-        if FEED_POINTER_FILE.exists():
-            return json.loads(FEED_POINTER_FILE.read_text())
-        return {"address": None, "requests": []}
+        """Load the local cache of feed pointer (shared; see storage.cached_load)."""
+        return cached_load(FEED_POINTER_FILE, lambda: {"address": None, "requests": []})
     
     def _save_feed_pointer(self, data: dict):
         """Save the feed pointer cache."""
-        FEED_POINTER_FILE.write_text(json.dumps(data, indent=2))
+        write_cached(FEED_POINTER_FILE, dumps(data), data)
     
     def post_request(self, request: dict) -> str:
         """Post a new request to the feed.
@@ -49,10 +58,10 @@ class RequestFeed:
         # Add metadata
         full_request = {
             "type": "ai_market_request",
-            "version": "0.1",
-            "request_id": hashlib.sha256(
-                json.dumps(request, sort_keys=True).encode()
-            ).hexdigest()[:12],
+            "version": "0.2",  # 0.2: request_id is blake2b (0.1 used sha256)
+            "request_id": hashlib.blake2b(
+                dumps(request, sort_keys=True), digest_size=6
+            ).hexdigest(),
             "status": "open",
             "created": datetime.now().isoformat(),
             **request
@@ -66,14 +75,15 @@ class RequestFeed:
             print(f"  Address: {address}")
             
             # Add to local feed cache
-            feed = self._load_feed_pointer()
-            feed["requests"].append({
-                "request_id": full_request["request_id"],
-                "address": address,
-                "status": "open",
-                "created": full_request["created"]
-            })
-            self._save_feed_pointer(feed)
+            with file_lock(FEED_POINTER_FILE):
+                feed = self._load_feed_pointer()
+                feed["requests"].append({
+                    "request_id": full_request["request_id"],
+                    "address": address,
+                    "status": "open",
+                    "created": full_request["created"]
+                })
+                self._save_feed_pointer(feed)
             
         return address
     
@@ -86,26 +96,64 @@ class RequestFeed:
         """Retrieve a specific request from Autonomi."""
         return self.client.backend.get_data(address)
     
+    def _load_indexed(self):
+        """Feed pointer plus request_id -> [entries] (ids can repeat on re-posts)."""
+        return cached_index(FEED_POINTER_FILE, "by_request_id", _entries_by_request_id,
+                            lambda: {"address": None, "requests": []})
+    
+    @contextmanager
+    def transaction(self):
+        """Coalesce mark_assigned/mark_complete calls into one pointer write.
+        
+        Updates are applied in a single load/save when the block exits,
+        even if it raises: each one records work that already happened
+        (a bid or result uploaded), so dropping it would make the request
+        look open and get processed twice. Until then the feed still shows
+        the old status. Nested transaction() calls join the outer one.
+        """
+        if self._pending is not None:
+            yield
+            return
+        self._pending = {}
+        try:
+            yield
+        finally:
+            with self._pending_lock:
+                pending, self._pending = self._pending, None
+            if pending:
+                self._apply_updates(pending)
+    
+    def _apply_updates(self, updates: Dict[str, dict]):
+        with file_lock(FEED_POINTER_FILE):
+            feed, by_request_id = self._load_indexed()
+            for request_id, fields in updates.items():
+                for req in by_request_id.get(request_id, ()):
+                    req.update(fields)
+            self._save_feed_pointer(feed)
+    
+    def _mark(self, request_id: str, fields: dict):
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending.setdefault(request_id, {}).update(fields)
+                return
+        self._apply_updates({request_id: fields})
+    
     def mark_assigned(self, request_id: str, bidder: str, price: float):
         """Mark a request as assigned to a bidder."""
-        feed = self._load_feed_pointer()
-        for req in feed["requests"]:
-            if req["request_id"] == request_id:
-                req["status"] = "assigned"
-                req["assigned_to"] = bidder
-                req["assigned_price"] = price
-                req["assigned_at"] = datetime.now().isoformat()
-        self._save_feed_pointer(feed)
+        self._mark(request_id, {
+            "status": "assigned",
+            "assigned_to": bidder,
+            "assigned_price": price,
+            "assigned_at": datetime.now().isoformat()
+        })
     
     def mark_complete(self, request_id: str, result_address: str):
         """Mark a request as complete with result."""
-        feed = self._load_feed_pointer()
-        for req in feed["requests"]:
-            if req["request_id"] == request_id:
-                req["status"] = "complete"
-                req["result_address"] = result_address
-                req["completed_at"] = datetime.now().isoformat()
-        self._save_feed_pointer(feed)
+        self._mark(request_id, {
+            "status": "complete",
+            "result_address": result_address,
+            "completed_at": datetime.now().isoformat()
+        })
     
     def list_all(self) -> List[Dict]:
         """List all requests in the feed."""
@@ -156,7 +204,7 @@ def main():
     elif cmd == "get":
         address = sys.argv[2]
         data = feed.get_request(address)
-        print(json.dumps(data, indent=2))
+        print(dumps(data, indent=True).decode())
     
     elif cmd == "demo":
         address = feed.post_request({
@@ -12,29 +12,45 @@ This version is designed for Free AI entities that want to
 maximize their earnings while maintaining quality.
 """
 
-import json
-import time
-import subprocess
+import copy
+import atexit
+import threading
+from collections import deque
 import sys
-import re
+import math
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict, List
 
+try:
+    import ahocorasick  # pyahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
 # Import from queue simulator
 sys.path.insert(0, str(Path(__file__).parent))
 from queue_simulator import (
     list_open_requests,
     submit_bid,
-    get_bids_for_request,
     select_winner,
     submit_result,
     get_request,
-    load_json,
     save_json,
     QUEUE_FILE,
     BIDS_FILE
 )
+import requests
+import ollama_client
+from storage import dumps, loads, cached_load, cached_index, write_cached, atomic_write, file_lock
 
 # ═══════════════════════════════════════════════════════════════════
 # MODEL CAPABILITIES
@@ -75,6 +91,19 @@ TASK_CATEGORIES = {
     "general": ["what is", "tell me", "help me", "summarize", "translate"]
 }
 
+# keyword -> categories it counts toward
+_KEYWORD_CATEGORIES = {}
+for _category, _keywords in TASK_CATEGORIES.items():
+    for _kw in _keywords:
+        _KEYWORD_CATEGORIES.setdefault(_kw, []).append(_category)
+
+# With pyahocorasick, every keyword is found in one pass over the prompt
+if HAS_AHOCORASICK:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _kw in _KEYWORD_CATEGORIES:
+        _KEYWORD_AUTOMATON.add_word(_kw, _kw)
+    _KEYWORD_AUTOMATON.make_automaton()
+
 # ═══════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════
@@ -93,27 +122,51 @@ CONFIG = {
     "complexity_multiplier_max": 3.0,
     "competition_adjustment": True,
     
+    # Bid ranking (Cobb–Douglas: score = quality^(1-w) * price^(-w))
+    "price_weight": 0.5,
+    "max_bids_per_tick": 10,  # Only the best-scoring requests get a bid
+    
     # Quality thresholds
     "min_capability_match": 0.5,  # Don't bid if we're <50% suited
     
     # Reputation
-    "reputation_file": Path(__file__).parent / "reputation.json"
+    "reputation_file": Path(__file__).parent / "reputation.json",
+    "reputation_history_file": Path(__file__).parent / "reputation_history.ndjson",
 }
 
 # ═══════════════════════════════════════════════════════════════════
 # TASK ANALYSIS
 # ═══════════════════════════════════════════════════════════════════
 
+def _category_scores(prompt_lower: str) -> Dict[str, int]:
+    """Number of distinct keywords of each category found in the prompt."""
+    if not HAS_AHOCORASICK:
+        category_scores = {}
+        for category, keywords in TASK_CATEGORIES.items():
+            score = sum(1 for kw in keywords if kw in prompt_lower)
+            if score > 0:
+                category_scores[category] = score
+        return category_scores
+    
+    counts = {}
+    for kw in {kw for _, kw in _KEYWORD_AUTOMATON.iter(prompt_lower)}:
+        for category in _KEYWORD_CATEGORIES[kw]:
+            counts[category] = counts.get(category, 0) + 1
+    # Keep TASK_CATEGORIES order so ties pick the same dominant category
+    return {category: counts[category] for category in TASK_CATEGORIES if category in counts}
+
+# Sized for a few thousand open requests, so a large backlog doesn't
+# cycle entries out between daemon ticks
+@lru_cache(maxsize=4096)
 def analyze_prompt(prompt: str) -> Dict:
-    """Analyze a prompt to understand what kind of task it is."""
+    """Analyze a prompt to understand what kind of task it is.
+    
+    Results are memoized per prompt; treat the returned dict as read-only.
+    """
     prompt_lower = prompt.lower()
     
     # Detect categories
-    category_scores = {}
-    for category, keywords in TASK_CATEGORIES.items():
-        score = sum(1 for kw in keywords if kw in prompt_lower)
-        if score > 0:
-            category_scores[category] = score
+    category_scores = _category_scores(prompt_lower)
     
     # Pick dominant category
     if category_scores:
@@ -150,8 +203,7 @@ def analyze_prompt(prompt: str) -> Dict:
         "estimated_tokens": word_count * 1.3  # Rough estimate
     }
 
-def calculate_capability_match(model_key: str, task_category: str) -> float:
-    """How well does this model match the task? Returns 0-1."""
+def _compute_capability_match(model_key: str, task_category: str) -> float:
     model = MODELS.get(model_key, MODELS["devstral"])
     
     if task_category in model["capabilities"]:
@@ -167,10 +219,44 @@ def calculate_capability_match(model_key: str, task_category: str) -> float:
     
     return 0.5  # Base capability
 
+# Every (model, category) pair is known up front, so match scores are
+# computed once at import
+_CAPABILITY_TABLE = {
+    (model_key, category): _compute_capability_match(model_key, category)
+    for model_key in MODELS for category in TASK_CATEGORIES
+}
+
+def calculate_capability_match(model_key: str, task_category: str) -> float:
+    """How well does this model match the task? Returns 0-1."""
+    match = _CAPABILITY_TABLE.get((model_key, task_category))
+    if match is None:  # model or category outside the table
+        match = _compute_capability_match(model_key, task_category)
+    return match
+
 # ═══════════════════════════════════════════════════════════════════
 # SMART PRICING
 # ═══════════════════════════════════════════════════════════════════
 
+def _bid_summary(bids: list) -> Dict[str, tuple]:
+    """request_id -> (lowest bid price, whether we already bid)."""
+    address = CONFIG["bidder_address"]
+    summary = {}
+    for b in bids:
+        price = b["bid"]["price_ant"]
+        lowest, ours = summary.get(b["request_id"], (price, False))
+        summary[b["request_id"]] = (min(lowest, price), ours or b["bidder"]["address"] == address)
+    return summary
+
+def _competition(request_id: str) -> Optional[tuple]:
+    """(lowest price, we bid) for a request, from one pass over bids.json per change."""
+    _, summary = cached_index(BIDS_FILE, f"summary:{CONFIG['bidder_address']}", _bid_summary, list)
+    return summary.get(request_id)
+
+def bid_score(capability: float, price: float) -> float:
+    """Log Cobb–Douglas score of our bid: better matched and cheaper ranks higher."""
+    w = CONFIG["price_weight"]
+    return (1 - w) * math.log(capability) - w * math.log(price)
+
 def calculate_smart_price(request: dict, analysis: dict) -> Optional[float]:
     """Calculate optimal price based on task analysis."""
     max_price = request["economics"]["max_price_ant"]
@@ -192,11 +278,10 @@ def calculate_smart_price(request: dict, analysis: dict) -> Optional[float]:
     
     # Check competition
     if CONFIG["competition_adjustment"]:
-        existing_bids = get_bids_for_request(request["id"])
-        if existing_bids:
-            lowest_bid = min(b["price_ant"] for b in existing_bids)
+        competition = _competition(request["id"])
+        if competition:
             # Bid slightly lower to be competitive
-            target_price = min(target_price, lowest_bid * 0.95)
+            target_price = min(target_price, competition[0] * 0.95)
     
     # Ensure within bounds
     if target_price < CONFIG["min_price_ant"]:
@@ -212,12 +297,21 @@ def calculate_smart_price(request: dict, analysis: dict) -> Optional[float]:
 # QUALITY ASSESSMENT
 # ═══════════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=4096)
+def _prompt_tokens(prompt: str) -> frozenset:
+    """Lowercased word set of a prompt (memoized; prompts repeat across calls)."""
+    return frozenset(prompt.lower().split())
+
 def estimate_quality(response: str, prompt: str, analysis: dict) -> float:
     """Self-assess the quality of our response. Returns 0-1."""
     quality = 0.5  # Base quality
     
+    # Lowercase and tokenize the response once; every check below reuses these
+    response_lower = response.lower()
+    response_tokens = response_lower.split()
+    
     # Length check - too short is bad
-    response_words = len(response.split())
+    response_words = len(response_tokens)
     if response_words < 10:
         quality -= 0.2
     elif response_words > 50:
@@ -227,13 +321,12 @@ def estimate_quality(response: str, prompt: str, analysis: dict) -> float:
     if analysis["category"] == "code":
         if "```" in response or "def " in response or "function" in response:
             quality += 0.2  # Contains code
-        if "error" in response.lower() and "error" not in prompt.lower():
+        # The prompt is only lowercased when the response mentions an error
+        if "error" in response_lower and "error" not in prompt.lower():
             quality -= 0.1  # Generated error
     
     # Coherence check - response should relate to prompt
-    prompt_words = set(prompt.lower().split())
-    response_words_set = set(response.lower().split())
-    overlap = len(prompt_words & response_words_set)
+    overlap = len(_prompt_tokens(prompt).intersection(response_tokens))
     if overlap > 3:
         quality += 0.1
     
@@ -247,25 +340,161 @@ def estimate_quality(response: str, prompt: str, analysis: dict) -> float:
 # REPUTATION TRACKING
 # ═══════════════════════════════════════════════════════════════════
 
-def load_reputation() -> Dict:
-    """Load reputation data."""
-    if CONFIG["reputation_file"].exists():
-        return json.loads(CONFIG["reputation_file"].read_text())
+# Beta-evidence reputation: r and s are the discounted sums of quality and
+# of job weight, so each job is an O(1) update and the score never needs
+# the history. REPUTATION_MU is the score's ceiling (a long run of
+# quality-1.0 jobs), used to normalise it to 0-1.
+REPUTATION_LAMBDA = 0.9
+_REPUTATION_HORIZON = 1 / (1 - REPUTATION_LAMBDA)
+REPUTATION_MU = (_REPUTATION_HORIZON + 1) / (_REPUTATION_HORIZON + 2)
+
+def _empty_reputation() -> Dict:
     return {
         "total_jobs": 0,
         "total_earned": 0.0,
         "average_quality": 0.0,
         "jobs_by_category": {},
-        "history": []
+        "r": 0.0,
+        "s": 0.0,
+        "lambda_": REPUTATION_LAMBDA,
     }
 
+def reputation_score(rep: Dict) -> float:
+    """Discounted Beta reputation in 0-1 (about 0.55 with no jobs yet)."""
+    return (rep["r"] + 1) / (rep["s"] + 2) / REPUTATION_MU
+
+def load_reputation() -> Dict:
+    """Load reputation counters (cached until the file changes; see storage.cached_load).
+    
+    Per-job history lives in its own append-only file; see load_history().
+    """
+    rep = cached_load(CONFIG["reputation_file"], _empty_reputation)
+    if "history" in rep:  # file from before the split: move history out once
+        _write_history(rep.pop("history")[-HISTORY_LIMIT:])
+        save_reputation(rep)
+    if "r" not in rep:  # file from before Beta evidence: seed from the counters
+        rep["s"] = (1 - REPUTATION_LAMBDA ** rep["total_jobs"]) * _REPUTATION_HORIZON
+        rep["r"] = rep["average_quality"] * rep["s"]
+        rep["lambda_"] = REPUTATION_LAMBDA
+        save_reputation(rep)
+    return rep
+
 def save_reputation(rep: Dict):
     """Save reputation data."""
-    CONFIG["reputation_file"].write_text(json.dumps(rep, indent=2))
+    write_cached(CONFIG["reputation_file"], dumps(rep, indent=True), rep)
 
-def record_job(category: str, price: float, quality: float):
-    """Record a completed job for reputation."""
-    rep = load_reputation()
+# Jobs kept in the rolling history; the NDJSON file is trimmed back to
+# this many lines once it grows past HISTORY_COMPACT_BYTES
+HISTORY_LIMIT = 100
+HISTORY_COMPACT_BYTES = 64 * 1024
+
+def load_history(limit: int = HISTORY_LIMIT) -> deque:
+    """Most recent job records, oldest first."""
+    try:
+        with open(CONFIG["reputation_history_file"], "rb") as f:
+            lines = deque(f, maxlen=limit)  # only the tail gets parsed
+    except FileNotFoundError:
+        return deque(maxlen=limit)
+    return deque((loads(line) for line in lines if line.strip()), maxlen=limit)
+
+def _write_history(entries):
+    atomic_write(CONFIG["reputation_history_file"],
+                 b"".join(dumps(entry) + b"\n" for entry in entries))
+
+def _append_history(entries: List[Dict]):
+    """Append job lines; trim the file when it has grown large."""
+    path = CONFIG["reputation_history_file"]
+    with file_lock(path):
+        with open(path, "ab") as f:
+            f.write(b"".join(dumps(entry) + b"\n" for entry in entries))
+            size = f.tell()
+        if size > HISTORY_COMPACT_BYTES:
+            _write_history(load_history())
+
+# record_job updates the cached reputation in memory and a background
+# thread writes it out, so the daemon never waits on the disk. Updates
+# queued while a write is in flight coalesce into the next one.
+_rep_lock = threading.Lock()        # guards the pending state below
+_rep_flush_lock = threading.Lock()  # one flush on disk at a time
+_rep_wake = threading.Event()
+_rep_pending = None      # latest reputation dict not yet on disk
+_rep_inflight = None     # reputation dict a flush is writing right now
+_history_pending = []    # job lines not yet appended
+_rep_writer = None
+_rep_error = None        # last writer failure, re-raised by record_job
+
+def flush_reputation():
+    """Write queued reputation and history updates now.
+    
+    On failure the updates are queued again for the next flush.
+    """
+    global _rep_pending, _rep_inflight, _history_pending
+    with _rep_flush_lock:
+        with _rep_lock:
+            rep, _rep_pending = _rep_pending, None
+            _rep_inflight = rep
+            entries, _history_pending = _history_pending, []
+            # Serialized under the lock: record_job mutates rep in place
+            payload = dumps(rep, indent=True) if rep is not None else None
+        try:
+            if entries:
+                _append_history(entries)
+                entries = []
+            if payload is not None:
+                write_cached(CONFIG["reputation_file"], payload, rep)
+        except Exception:
+            with _rep_lock:
+                _history_pending[:0] = entries
+                if _rep_pending is None:
+                    _rep_pending = rep
+            raise
+        finally:
+            with _rep_lock:
+                _rep_inflight = None
+
+def _reputation_writer():
+    global _rep_error
+    while True:
+        _rep_wake.wait()
+        _rep_wake.clear()
+        try:
+            flush_reputation()
+        except Exception as e:
+            _rep_error = e
+
+def _queue_reputation_write():
+    global _rep_writer
+    if _rep_writer is None:
+        _rep_writer = threading.Thread(target=_reputation_writer, daemon=True)
+        _rep_writer.start()
+        atexit.register(flush_reputation)
+    _rep_wake.set()
+
+def record_job(category: str, price: float, quality: float, weight: float = 1.0):
+    """Record a completed job for reputation (written in the background).
+    
+    The job is always counted; a failed background write since the last
+    call is raised afterwards (its updates stay queued for retry).
+    """
+    global _rep_error
+    with _rep_lock:
+        # Unwritten updates are newer than the file. Only the private
+        # pending dict is changed in place: the cached and in-flight ones
+        # are copied, so neither gets ahead of what has been written.
+        rep = _rep_pending or copy.deepcopy(_rep_inflight or load_reputation())
+        _update_reputation(rep, category, price, quality, weight)
+    _queue_reputation_write()
+    
+    if _rep_error is not None:
+        error, _rep_error = _rep_error, None
+        raise error
+
+def _update_reputation(rep: Dict, category: str, price: float, quality: float, weight: float):
+    global _rep_pending
+    
+    # Discounted evidence behind reputation_score()
+    rep["r"] = REPUTATION_LAMBDA * rep["r"] + weight * quality
+    rep["s"] = REPUTATION_LAMBDA * rep["s"] + weight
     
     rep["total_jobs"] += 1
     rep["total_earned"] += price
@@ -281,16 +510,26 @@ def record_job(category: str, price: float, quality: float):
         rep["jobs_by_category"][category] = 0
     rep["jobs_by_category"][category] += 1
     
-    # Add to history (keep last 100)
-    rep["history"].append({
+    # Add to history (audit only; last HISTORY_LIMIT jobs are kept)
+    _history_pending.append({
         "timestamp": datetime.now().isoformat(),
         "category": category,
         "price": price,
         "quality": quality
     })
-    rep["history"] = rep["history"][-100:]
     
-    save_reputation(rep)
+    _rep_pending = rep
+
+def print_status():
+    """Print the reputation summary (including updates not yet on disk)."""
+    with _rep_lock:
+        rep = _rep_pending or _rep_inflight or load_reputation()
+        print("Reputation Status:")
+        print(f"  Total jobs: {rep['total_jobs']}")
+        print(f"  Total earned: {rep['total_earned']:.4f} ANT")
+        print(f"  Average quality: {rep['average_quality']:.2f}")
+        print(f"  Reputation score: {reputation_score(rep):.2f}")
+        print(f"  Jobs by category: {rep['jobs_by_category']}")
 
 # ═══════════════════════════════════════════════════════════════════
 # INFERENCE ENGINE
@@ -322,18 +561,13 @@ def run_inference(prompt: str, model_key: str = None, max_tokens: int = 500) ->
         except Exception as e:
             print(f"   ⚠️ API error: {e}")
     
-    # Fallback to Ollama
+    # Fallback to local Ollama (HTTP API, model kept loaded between calls)
     model = MODELS.get(model_key, MODELS["devstral"])
     try:
-        result = subprocess.run(
-            ["ollama", "run", model["name"].split(":")[0], prompt],
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        if result.returncode == 0:
-            return result.stdout.strip()
-    except (FileNotFoundError, subprocess.TimeoutExpired):
+        response = ollama_client.generate(prompt, model["name"].split(":")[0], max_tokens)
+        if response is not None:
+            return response
+    except requests.RequestException:
         pass
     except Exception as e:
         print(f"   ⚠️ Ollama error: {e}")
@@ -345,21 +579,27 @@ def run_inference(prompt: str, model_key: str = None, max_tokens: int = 500) ->
 # BIDDING LOGIC
 # ═══════════════════════════════════════════════════════════════════
 
+# Ids of open requests we bid on or can never bid on; daemon_tick skips
+# them and drops them once they leave the open list
+_decided = set()
+
 def should_bid(request: dict) -> tuple[bool, Optional[dict]]:
     """Determine if we should bid on this request. Returns (should_bid, analysis)."""
     max_price = request["economics"]["max_price_ant"]
     
     # Price bounds check
     if max_price < CONFIG["min_price_ant"]:
+        _decided.add(request["id"])
         return False, None
     if max_price > CONFIG["max_price_ant"]:
+        _decided.add(request["id"])
         return False, None
     
     # Check if we already bid
-    bids = get_bids_for_request(request["id"])
-    for bid in bids:
-        if bid["bidder"]["address"] == CONFIG["bidder_address"]:
-            return False, None
+    competition = _competition(request["id"])
+    if competition and competition[1]:
+        _decided.add(request["id"])
+        return False, None
     
     # Analyze the task
     analysis = analyze_prompt(request["request"]["prompt"])
@@ -367,6 +607,7 @@ def should_bid(request: dict) -> tuple[bool, Optional[dict]]:
     # Check capability match
     capability = calculate_capability_match(CONFIG["primary_model"], analysis["category"])
     if capability < CONFIG["min_capability_match"]:
+        _decided.add(request["id"])
         return False, analysis
     
     return True, analysis
@@ -403,16 +644,17 @@ def process_winning_bid(request: dict, bid: dict):
 # DAEMON LOOP
 # ═══════════════════════════════════════════════════════════════════
 
+def _won_by_us(bids: list) -> List[dict]:
+    address = CONFIG["bidder_address"]
+    return [b for b in bids if b["status"] == "won" and b["bidder"]["address"] == address]
+
 def check_won_bids():
     """Check if any of our bids have won and need processing."""
-    bids = load_json(BIDS_FILE)
+    # Prefiltered once per change of bids.json, so idle ticks don't walk
+    # the whole bid history
+    _, won = cached_index(BIDS_FILE, f"won_by:{CONFIG['bidder_address']}", _won_by_us, list)
     
-    for bid in bids:
-        if bid["bidder"]["address"] != CONFIG["bidder_address"]:
-            continue
-        if bid["status"] != "won":
-            continue
-        
+    for bid in list(won):
         request = get_request(bid["request_id"])
         if request and request.get("status") == "assigned":
             if CONFIG["auto_process"]:
@@ -424,24 +666,51 @@ def daemon_tick():
     
     requests = list_open_requests()
     print(f"   Open requests: {len(requests)}")
+    _decided.intersection_update(req["id"] for req in requests)
     
+    # Price everything first, then bid on the best-scoring requests
+    candidates = []
     for req in requests:
+        if req["id"] in _decided:
+            continue
         should, analysis = should_bid(req)
         if should and analysis:
             price = calculate_smart_price(req, analysis)
             if price:
-                print(f"   📝 {req['id']}")
-                print(f"      Category: {analysis['category']} (complexity: {analysis['complexity']})")
-                print(f"      Bidding: {price} ANT")
-                submit_bid(
-                    req["id"],
-                    price,
-                    MODELS[CONFIG["primary_model"]]["name"],
-                    CONFIG["bidder_address"]
-                )
+                capability = calculate_capability_match(CONFIG["primary_model"], analysis["category"])
+                candidates.append((bid_score(capability, price), req, analysis, price))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    
+    for _, req, analysis, price in candidates[:CONFIG["max_bids_per_tick"]]:
+        print(f"   📝 {req['id']}")
+        print(f"      Category: {analysis['category']} (complexity: {analysis['complexity']})")
+        print(f"      Bidding: {price} ANT")
+        submit_bid(
+            req["id"],
+            price,
+            MODELS[CONFIG["primary_model"]]["name"],
+            CONFIG["bidder_address"]
+        )
+        _decided.add(req["id"])
     
     check_won_bids()
 
+def _watch_queue(wake: threading.Event):
+    """Start a watchdog observer that sets wake when the queue or bids change."""
+    watched = {str(QUEUE_FILE), str(BIDS_FILE)}
+    
+    class QueueChanged(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # Saves are atomic renames, so the path may be the move target
+            if event.src_path in watched or getattr(event, "dest_path", None) in watched:
+                wake.set()
+    
+    observer = Observer()
+    observer.schedule(QueueChanged(), str(QUEUE_FILE.parent))
+    observer.daemon = True
+    observer.start()
+    return observer
+
 def run_daemon():
     """Run the smart bidder daemon."""
     rep = load_reputation()
@@ -456,15 +725,24 @@ def run_daemon():
     print(f"Total jobs: {rep['total_jobs']}")
     print(f"Total earned: {rep['total_earned']:.4f} ANT")
     print(f"Average quality: {rep['average_quality']:.2f}")
+    print(f"Reputation score: {reputation_score(rep):.2f}")
     print("=" * 60)
     print("Press Ctrl+C to stop\n")
     
+    # With watchdog, tick as soon as the queue or bids change;
+    # poll_interval_s remains the upper bound between ticks
+    wake = threading.Event()
+    observer = _watch_queue(wake) if HAS_WATCHDOG else None
     try:
         while True:
             daemon_tick()
-            time.sleep(CONFIG["poll_interval_s"])
+            wake.wait(CONFIG["poll_interval_s"])
+            wake.clear()
     except KeyboardInterrupt:
         print("\n\nDaemon stopped.")
+    finally:
+        if observer:
+            observer.stop()
 
 # ═══════════════════════════════════════════════════════════════════
 # CLI
@@ -500,12 +778,7 @@ def main():
         print(f"  capability_match: {match}")
     
     elif cmd == "status":
-        rep = load_reputation()
-        print("Reputation Status:")
-        print(f"  Total jobs: {rep['total_jobs']}")
-        print(f"  Total earned: {rep['total_earned']:.4f} ANT")
-        print(f"  Average quality: {rep['average_quality']:.2f}")
-        print(f"  Jobs by category: {rep['jobs_by_category']}")
+        print_status()
     
     elif cmd == "test":
         prompt = sys.argv[2] if len(sys.argv) > 2 else "Hello, what is 2+2?"
@@ -0,0 +1,194 @@
+"""
+AI-Market Storage Helpers
+
+Shared JSON encoding for the file-backed stores and the AntTP wire format.
+Uses orjson when it is installed (bytes in, bytes out), stdlib json otherwise.
+Both paths emit the same compact bytes, so content addresses don't depend
+on which library is present.
+
+Also the shared SQLite connection setup for the local stores, a
+stat-validated cache of parsed JSON files, and atomic, locked file writes.
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False  # Windows: file_lock() becomes a no-op
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    import json
+    HAS_ORJSON = False
+
+
+def dumps(data, indent: bool = False, sort_keys: bool = False, default=None) -> bytes:
+    """Serialize to JSON bytes (compact unless indent=True)."""
+    if HAS_ORJSON:
+        option = 0
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, default=default, option=option)
+    if indent:
+        text = json.dumps(data, indent=2, sort_keys=sort_keys,
+                          ensure_ascii=False, default=default)
+    else:
+        text = json.dumps(data, separators=(",", ":"), sort_keys=sort_keys,
+                          ensure_ascii=False, default=default)
+    return text.encode()
+
+
+def loads(data):
+    """Parse JSON from bytes or str."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def connect_db(path, synchronous: str = "NORMAL",
+               check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a SQLite store in WAL mode with dict-like rows.
+    
+    WAL + synchronous=NORMAL makes each commit one append to the log;
+    call durable(db) around commits that must survive a power loss.
+    """
+    db = sqlite3.connect(path, check_same_thread=check_same_thread)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(f"PRAGMA synchronous={synchronous}")
+    return db
+
+
+@contextmanager
+def durable(db: sqlite3.Connection):
+    """Run the enclosed commits with synchronous=FULL."""
+    db.execute("PRAGMA synchronous=FULL")
+    try:
+        yield db
+    finally:
+        db.execute("PRAGMA synchronous=NORMAL")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PARSED-FILE CACHE
+# ═══════════════════════════════════════════════════════════════════
+
+# path -> (stat key, parsed object, {index name: derived index})
+_FILE_CACHE = {}
+
+def _stat_key(path):
+    """What identifies a file's contents without reading it. atomic_write
+    swaps in a new inode, so st_ino catches a same-size replace within
+    mtime granularity; st_ctime_ns catches anything that restores mtime.
+    """
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size
+
+def cached_load(path, default=dict):
+    """Parse a JSON file, reusing the last parse while the file is unchanged.
+    
+    The returned object is shared with later callers. Treat it as read-only
+    unless you write it back with the matching save function (which goes
+    through write_cached()), so the cache never diverges from what's on
+    disk: if that write fails, the entry is dropped and the next load
+    re-reads the file.
+    Missing files return default().
+    """
+    path = str(path)
+    try:
+        key = _stat_key(path)
+    except FileNotFoundError:
+        _FILE_CACHE.pop(path, None)
+        return default()
+    cached = _FILE_CACHE.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, "rb") as f:
+        data = loads(f.read())
+    _FILE_CACHE[path] = (key, data, {})
+    return data
+
+def remember(path, data):
+    """Record data as the current contents of path, right after writing it."""
+    path = str(path)
+    _FILE_CACHE[path] = (_stat_key(path), data, {})
+
+def write_cached(path, payload: bytes, data, fsync: bool = False):
+    """atomic_write payload (data serialized), then remember(path, data).
+    
+    Callers mutate the cached object before saving it, so on a failed
+    write the cache entry is dropped rather than left ahead of the file.
+    """
+    try:
+        atomic_write(path, payload, fsync)
+    except BaseException:
+        _FILE_CACHE.pop(str(path), None)
+        raise
+    remember(path, data)
+
+def cached_index(path, name: str, build, default=dict):
+    """Return (data, index) for a JSON file, where index = build(data).
+    
+    The index is built once per parse of the file and dropped when the file
+    changes or is written through remember(), so it always matches data.
+    Like cached_load, both objects are shared: the index holds references
+    into data, and mutating a record through it mutates data.
+    """
+    data = cached_load(path, default)
+    entry = _FILE_CACHE.get(str(path))
+    if entry is None or entry[1] is not data:
+        return data, build(data)  # file missing: nothing to memoize
+    indexes = entry[2]
+    if name not in indexes:
+        indexes[name] = build(data)
+    return data, indexes[name]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ATOMIC WRITES
+# ═══════════════════════════════════════════════════════════════════
+
+def atomic_write(path, data: bytes, fsync: bool = False):
+    """Replace path with data so readers see the old file or the new one,
+    never a torn write. fsync=True also flushes file and directory to disk.
+    """
+    path = str(path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if fsync and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock for a read-modify-write of path.
+    
+    The lock lives on a sibling .lock file, since atomic_write replaces
+    the data file itself. Not re-entrant: don't nest locks on one path.
+    """
+    if not HAS_FCNTL:
+        yield
+        return
+    os.makedirs(os.path.dirname(str(path)) or ".", exist_ok=True)
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
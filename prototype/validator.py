@@ -6,8 +6,10 @@ Can be used by requesters for auto-approval or by validators for dispute resolut
 """
 
 import json
+import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Tuple, Optional
 
 # Quality thresholds
 THRESHOLDS = {
@@ -16,13 +18,60 @@ THRESHOLDS = {
     "dispute": 0.4,        # Below this, recommend dispute
 }
 
+# Weight of each check in the overall quality score
+WEIGHTS = {
+    "length": 0.15,
+    "relevance": 0.35,
+    "completeness": 0.20,
+    "format": 0.10,
+    "code_quality": 0.20,
+}
+
+# Indicator phrases. Each group is compiled into one alternation, so a
+# check is a single scan of the response instead of one scan per phrase.
+ERROR_INDICATORS = ["SyntaxError", "TypeError", "NameError", "undefined", "error:"]
+EXPLANATION_WORDS = ["here's", "this", "explanation", "comment", "note:"]
+CONCLUSION_WORDS = ["result", "output", "return", "hope this helps", "let me know"]
+
+# Words ignored when comparing prompt and response terms
+COMMON_WORDS = frozenset({"a", "an", "the", "is", "are", "in", "on", "at", "to", "for",
+                          "of", "and", "or", "that", "this", "with"})
+
+def _alternation(phrases) -> re.Pattern:
+    return re.compile("|".join(re.escape(p) for p in phrases))
+
+_CODE_RE = _alternation(["```", "def ", "function "])
+# (name, lowercased) pairs, in reporting order
+_ERROR_INDICATORS_LOWER = tuple((e, e.lower()) for e in ERROR_INDICATORS)
+_ERROR_RE = _alternation([lower for _, lower in _ERROR_INDICATORS_LOWER])
+_EXPLANATION_RE = _alternation(EXPLANATION_WORDS)
+_CONCLUSION_RE = _alternation(CONCLUSION_WORDS)
+_FORMAT_RE = _alternation(["#", "**", "- "])
+
 # ═══════════════════════════════════════════════════════════════════
 # QUALITY CHECKS
 # ═══════════════════════════════════════════════════════════════════
 
-def check_response_length(prompt: str, response: str, category: str) -> Tuple[float, str]:
+def response_context(response: str) -> Dict:
+    """Lowercased text, tokens and line count of a response, computed once.
+    
+    validate_response builds this and hands it to every check; checks
+    called on their own build it themselves.
+    """
+    lower = response.lower()
+    words = lower.split()
+    return {
+        "lower": lower,
+        "word_count": len(words),
+        "tokens": frozenset(words),
+        "line_count": response.count("\n") + 1,
+    }
+
+def check_response_length(prompt: str, response: str, category: str,
+                          ctx: Optional[Dict] = None) -> Tuple[float, str]:
     """Check if response length is appropriate for the task."""
-    words = len(response.split())
+    ctx = ctx or response_context(response)
+    words = ctx["word_count"]
     
     # Expected word counts by category
     expectations = {
@@ -43,17 +92,17 @@ def check_response_length(prompt: str, response: str, category: str) -> Tuple[fl
     else:
         return 1.0, "Response length appropriate"
 
-def check_relevance(prompt: str, response: str) -> Tuple[float, str]:
+@lru_cache(maxsize=1024)
+def _prompt_terms(prompt: str) -> frozenset:
+    """Key terms of a prompt: lowercased words minus COMMON_WORDS (memoized)."""
+    return frozenset(prompt.lower().split()) - COMMON_WORDS
+
+def check_relevance(prompt: str, response: str, ctx: Optional[Dict] = None) -> Tuple[float, str]:
     """Check if response relates to the prompt."""
-    prompt_lower = prompt.lower()
-    response_lower = response.lower()
-    
+    ctx = ctx or response_context(response)
     # Extract key terms from prompt (skip common words)
-    common_words = {"a", "an", "the", "is", "are", "in", "on", "at", "to", "for", "of", "and", "or", "that", "this", "with"}
-    prompt_words = set(prompt_lower.split()) - common_words
-    response_words = set(response_lower.split())
-    
-    overlap = prompt_words & response_words
+    prompt_words = _prompt_terms(prompt)
+    overlap = prompt_words & ctx["tokens"]
     overlap_ratio = len(overlap) / max(len(prompt_words), 1)
     
     if overlap_ratio < 0.1:
@@ -63,34 +112,36 @@ def check_relevance(prompt: str, response: str) -> Tuple[float, str]:
     else:
         return 1.0, f"Response relevant ({len(overlap)} shared terms)"
 
-def check_code_quality(response: str) -> Tuple[float, str]:
+def check_code_quality(response: str, ctx: Optional[Dict] = None) -> Tuple[float, str]:
     """Check code-related quality indicators."""
+    ctx = ctx or response_context(response)
     score = 1.0
     notes = []
+    response_lower = ctx["lower"]
     
     # Check for code blocks
-    has_code = "```" in response or "def " in response or "function " in response
+    has_code = _CODE_RE.search(response) is not None
     if not has_code:
         score -= 0.3
         notes.append("No code block found")
     
-    # Check for common errors
-    error_indicators = ["SyntaxError", "TypeError", "NameError", "undefined", "error:"]
-    for err in error_indicators:
-        if err.lower() in response.lower():
+    # Check for common errors (reported in ERROR_INDICATORS order)
+    found = set(_ERROR_RE.findall(response_lower))
+    for err, err_lower in _ERROR_INDICATORS_LOWER:
+        if err_lower in found:
             score -= 0.2
             notes.append(f"Contains error: {err}")
             break
     
     # Check for explanation
-    has_explanation = any(word in response.lower() for word in ["here's", "this", "explanation", "comment", "note:"])
+    has_explanation = _EXPLANATION_RE.search(response_lower) is not None
     if has_explanation:
         score += 0.1
         notes.append("Includes explanation")
     
     return max(0, score), "; ".join(notes) if notes else "Code looks reasonable"
 
-def check_completeness(prompt: str, response: str) -> Tuple[float, str]:
+def check_completeness(prompt: str, response: str, ctx: Optional[Dict] = None) -> Tuple[float, str]:
     """Check if response appears complete."""
     # Truncation indicators
     if response.endswith("...") or response.endswith(".."):
@@ -103,19 +154,20 @@ def check_completeness(prompt: str, response: str) -> Tuple[float, str]:
             return 0.4, "Incomplete code block"
     
     # Check for conclusion indicators
-    has_conclusion = any(word in response.lower()[-100:] for word in ["result", "output", "return", "hope this helps", "let me know"])
+    tail = (ctx["lower"] if ctx else response.lower())[-100:]
+    has_conclusion = _CONCLUSION_RE.search(tail) is not None
     if has_conclusion:
         return 1.0, "Response appears complete"
     
     return 0.8, "Response may be complete"
 
-def check_format(response: str) -> Tuple[float, str]:
+def check_format(response: str, ctx: Optional[Dict] = None) -> Tuple[float, str]:
     """Check response formatting quality."""
     score = 0.7  # Base score
     notes = []
     
     # Markdown formatting
-    if "#" in response or "**" in response or "- " in response:
+    if _FORMAT_RE.search(response):
         score += 0.1
         notes.append("Uses formatting")
     
@@ -125,8 +177,8 @@ def check_format(response: str) -> Tuple[float, str]:
         notes.append("Uses code blocks")
     
     # Readability
-    lines = response.split("\n")
-    if len(lines) > 3:
+    line_count = ctx["line_count"] if ctx else response.count("\n") + 1
+    if line_count > 3:
         score += 0.1
         notes.append("Well-structured")
     
@@ -136,6 +188,28 @@ def check_format(response: str) -> Tuple[float, str]:
 # MAIN VALIDATION
 # ═══════════════════════════════════════════════════════════════════
 
+# Check runners with one (prompt, response, category, ctx) signature
+_CHECKS = {
+    "length": check_response_length,
+    "relevance": lambda prompt, response, category, ctx: check_relevance(prompt, response, ctx),
+    "completeness": lambda prompt, response, category, ctx: check_completeness(prompt, response, ctx),
+    "format": lambda prompt, response, category, ctx: check_format(response, ctx),
+    "code_quality": lambda prompt, response, category, ctx: check_code_quality(response, ctx),
+}
+
+def _check_plan(names):
+    """((name, weight, check), ...) and the total weight, fixed from WEIGHTS."""
+    plan = tuple((name, WEIGHTS.get(name, 0.1), _CHECKS[name]) for name in names)
+    return plan, sum(weight for _, weight, _ in plan)
+
+# Keyed by "is a code category"; code and technical responses also get
+# the code quality check
+_GENERAL_CHECKS = ("length", "relevance", "completeness", "format")
+_CHECK_PLANS = {
+    False: _check_plan(_GENERAL_CHECKS),
+    True: _check_plan(_GENERAL_CHECKS + ("code_quality",)),
+}
+
 def validate_response(prompt: str, response: str, category: str = "general") -> Dict:
     """
     Validate a response and return detailed scoring.
@@ -148,28 +222,14 @@ def validate_response(prompt: str, response: str, category: str = "general") ->
             "notes": [...]
         }
     """
-    checks = {
-        "length": check_response_length(prompt, response, category),
-        "relevance": check_relevance(prompt, response),
-        "completeness": check_completeness(prompt, response),
-        "format": check_format(response),
-    }
-    
-    # Add code check for code-related categories
-    if category in ["code", "technical"]:
-        checks["code_quality"] = check_code_quality(response)
-    
-    # Calculate weighted average
-    weights = {
-        "length": 0.15,
-        "relevance": 0.35,
-        "completeness": 0.20,
-        "format": 0.10,
-        "code_quality": 0.20,
-    }
-    
-    total_weight = sum(weights.get(k, 0.1) for k in checks)
-    quality = sum(checks[k][0] * weights.get(k, 0.1) for k in checks) / total_weight
+    ctx = response_context(response)
+    plan, total_weight = _CHECK_PLANS[category in ("code", "technical")]
+    checks = {}
+    weighted = 0.0
+    for name, weight, check in plan:
+        checks[name] = result = check(prompt, response, category, ctx)
+        weighted += result[0] * weight
+    quality = weighted / total_weight
     
     # Determine recommendation
     if quality >= THRESHOLDS["auto_approve"]:
@@ -10,18 +10,33 @@ Only use for testing with small amounts.
 
 import os
 import json
+import time
+import asyncio
+import threading
+import importlib.util
 from decimal import Decimal
-from typing import Optional
+from functools import cache, cached_property, lru_cache
+from typing import Optional, Tuple, List
 from pathlib import Path
 from dotenv import load_dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-try:
-    from web3 import Web3
-    from web3.middleware import ExtraDataToPOAMiddleware
-    HAS_WEB3 = True
-except ImportError:
-    HAS_WEB3 = False
+# web3 pulls in eth-abi, eth-account and cryptography, so it is only
+# imported when a wallet or provider is first built (see _load_web3)
+HAS_WEB3 = importlib.util.find_spec("web3") is not None
+if not HAS_WEB3:
     print("Warning: web3 not installed. Run: pip install web3")
+Web3 = AsyncWeb3 = AsyncHTTPProvider = ExtraDataToPOAMiddleware = Account = None
+
+def _load_web3():
+    """Import web3 into this module's globals on first use."""
+    global Web3, AsyncWeb3, AsyncHTTPProvider, ExtraDataToPOAMiddleware, Account
+    if Web3 is None:
+        from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
+        from web3.middleware import ExtraDataToPOAMiddleware
+        from eth_account import Account
 
 # Load environment
 load_dotenv()
@@ -29,44 +44,289 @@ load_dotenv()
 # Arbitrum One configuration
 ARBITRUM_RPC = "https://arb1.arbitrum.io/rpc"
 
+# Public endpoints wallets fail over between, in order of preference
+# (override with a comma-separated ARBITRUM_RPCS env var)
+ARBITRUM_RPCS = [url.strip() for url in os.getenv("ARBITRUM_RPCS", ",".join([
+    ARBITRUM_RPC,
+    "https://arbitrum-one-rpc.publicnode.com",
+    "https://arbitrum.drpc.org",
+])).split(",") if url.strip()]
+FAILOVER_STATUS = {429, 500, 502, 503, 504}
+
+# RPC connection pool (shared by every wallet in the process)
+RPC_POOL_SIZE = 64
+RPC_TIMEOUT_S = 15
+
+# Receipt polling interval per chain id, matched to block time
+ARBITRUM_CHAIN_ID = 42161  # Arbitrum One
+CHAIN_POLLING_INTERVALS = {ARBITRUM_CHAIN_ID: 0.25}
+DEFAULT_POLLING_INTERVAL = 1.0
+
+# EIP-1559 fees: maxFeePerGas is a cap (only the base fee is charged), so
+# doubling the quoted gas price adds headroom for free; Arbitrum ignores
+# priority fees. Quotes are reused for FEE_CACHE_TTL_S within a burst.
+MAX_FEE_MULTIPLIER = 2
+PRIORITY_FEE_WEI = 0
+FEE_CACHE_TTL_S = 2.0
+
+# The local nonce counter is re-read from the node ('pending') this often,
+# and after any failed send
+NONCE_RESYNC_S = 60.0
+
 # ANT Token on Arbitrum (Autonomi)
 ANT_CONTRACT = "0xa78d8321B20c4Ef90eCd72f2588AA985A4BDb684"
 
-# Standard ERC-20 ABI (transfer, balanceOf, decimals)
-ERC20_ABI = json.loads('''[
+# Standard ERC-20 ABI (transfer, balanceOf, decimals, approve, allowance)
+_ERC20_ABI_JSON = '''[
     {"constant": true, "inputs": [], "name": "decimals", "outputs": [{"name": "", "type": "uint8"}], "type": "function"},
     {"constant": true, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf", "outputs": [{"name": "balance", "type": "uint256"}], "type": "function"},
-    {"constant": false, "inputs": [{"name": "_to", "type": "address"}, {"name": "_value", "type": "uint256"}], "name": "transfer", "outputs": [{"name": "", "type": "bool"}], "type": "function"}
-]''')
+    {"constant": false, "inputs": [{"name": "_to", "type": "address"}, {"name": "_value", "type": "uint256"}], "name": "transfer", "outputs": [{"name": "", "type": "bool"}], "type": "function"},
+    {"constant": false, "inputs": [{"name": "_spender", "type": "address"}, {"name": "_value", "type": "uint256"}], "name": "approve", "outputs": [{"name": "", "type": "bool"}], "type": "function"},
+    {"constant": true, "inputs": [{"name": "_owner", "type": "address"}, {"name": "_spender", "type": "address"}], "name": "allowance", "outputs": [{"name": "", "type": "uint256"}], "type": "function"}
+]'''
+
+# 4-byte selectors for hand-encoded calls
+TRANSFER_SELECTOR = bytes.fromhex("a9059cbb")    # transfer(address,uint256)
+BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")  # balanceOf(address)
+DECIMALS_SELECTOR = bytes.fromhex("313ce567")    # decimals()
+
+# Multicall3: many eth_calls in one, at the same address on every EVM chain
+MULTICALL3_CONTRACT = "0xcA11bde05977b3631167028862bE2a173976CA11"
+_MULTICALL3_ABI_JSON = '''[
+    {"inputs": [{"components": [{"name": "target", "type": "address"}, {"name": "callData", "type": "bytes"}], "name": "calls", "type": "tuple[]"}], "name": "aggregate", "outputs": [{"name": "blockNumber", "type": "uint256"}, {"name": "returnData", "type": "bytes[]"}], "stateMutability": "payable", "type": "function"}
+]'''
+
+# Disperse-style batch sender (transferFrom to each recipient in one tx).
+# No default: set DISPERSE_CONTRACT to a deployment you have verified.
+DISPERSE_CONTRACT = os.getenv("DISPERSE_CONTRACT")
+_DISPERSE_ABI_JSON = '''[
+    {"constant": false, "inputs": [{"name": "token", "type": "address"}, {"name": "recipients", "type": "address[]"}, {"name": "values", "type": "uint256[]"}], "name": "disperseToken", "outputs": [], "type": "function"}
+]'''
+
+# ABIs are parsed on first use and shared
+@cache
+def erc20_abi() -> list:
+    return json.loads(_ERC20_ABI_JSON)
+
+@cache
+def disperse_abi() -> list:
+    return json.loads(_DISPERSE_ABI_JSON)
+
+@cache
+def multicall3_abi() -> list:
+    return json.loads(_MULTICALL3_ABI_JSON)
+
+
+@lru_cache(maxsize=1024)
+def _checksum(address: str) -> str:
+    """EIP-55 checksum an address (memoized; the keccak is pure CPU).
+    
+    Mixed-case input is taken as already checksummed and must match:
+    to_checksum_address alone would silently "fix" a mistyped address,
+    and transfer calldata is encoded from this result directly.
+    """
+    _load_web3()
+    checksummed = Web3.to_checksum_address(address)
+    digits = address[2:]
+    if digits != digits.lower() and digits != digits.upper() and checksummed != address:
+        raise ValueError(f"Invalid EIP-55 checksum: {address}")
+    return checksummed
+
+def _eip1559_fees(gas_price: int) -> dict:
+    """Type-2 fee fields from an eth_gasPrice quote."""
+    return {
+        'type': 2,
+        'maxFeePerGas': gas_price * MAX_FEE_MULTIPLIER + PRIORITY_FEE_WEI,
+        'maxPriorityFeePerGas': PRIORITY_FEE_WEI,
+    }
+
+def _to_base_units(amount, unit: int) -> int:
+    """ANT amount -> base units, exactly (float math would drop low-order wei)."""
+    if isinstance(amount, int):
+        return amount * unit
+    return int(Decimal(str(amount)) * unit)
+
+def _address_word(address: str) -> bytes:
+    """An address as one left-padded 32-byte ABI word."""
+    return bytes.fromhex(address[2:]).rjust(32, b"\0")
+
+def _transfer_calldata(to_address: str, amount_wei: int) -> bytes:
+    """ABI-encoded transfer(to, amount): selector + two 32-byte words."""
+    return TRANSFER_SELECTOR + _address_word(to_address) + amount_wei.to_bytes(32, "big")
+
+_PROVIDERS = {}
+
+# Sent over a session without transport retries: urllib3 re-POSTs after a
+# read timeout or 5xx, when the node may already have the transaction
+UNRETRIED_METHODS = {"eth_sendRawTransaction"}
+
+def _rpc_session(max_retries) -> requests.Session:
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=RPC_POOL_SIZE,
+        pool_maxsize=RPC_POOL_SIZE,
+        max_retries=max_retries
+    ))
+    return session
+
+@cache
+def _rpc_provider_class():
+    """RPCHTTPProvider, defined once web3 is loaded (it subclasses HTTPProvider)."""
+    _load_web3()
+    
+    class RPCHTTPProvider(Web3.HTTPProvider):
+        """HTTPProvider that retries reads but sends transactions only once.
+        
+        Reads are idempotent, so POST is opted in to urllib3's retries;
+        UNRETRIED_METHODS go through a second provider with none.
+        """
+        
+        def __init__(self, url: str):
+            super().__init__(url, session=_rpc_session(Retry(
+                total=3, backoff_factor=0.2,
+                status_forcelist=[429, 502, 503, 504],
+                allowed_methods=frozenset({"POST"})
+            )), request_kwargs={"timeout": RPC_TIMEOUT_S})
+            self._send_provider = Web3.HTTPProvider(
+                url, session=_rpc_session(0), request_kwargs={"timeout": RPC_TIMEOUT_S}
+            )
+        
+        def make_request(self, method, params):
+            if method in UNRETRIED_METHODS:
+                return self._send_provider.make_request(method, params)
+            return super().make_request(method, params)
+    
+    return RPCHTTPProvider
+
+def get_provider(url: str = ARBITRUM_RPC):
+    """One provider per RPC URL, on keep-alive sessions (see RPCHTTPProvider)."""
+    if url not in _PROVIDERS:
+        _PROVIDERS[url] = _rpc_provider_class()(url)
+    return _PROVIDERS[url]
+
+def _make_w3(provider):
+    w3 = Web3(provider)
+    # Add PoA middleware for Arbitrum
+    w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+    return w3
+
+@cache
+def _failover_provider_class():
+    """FailoverHTTPProvider, defined once web3 is loaded (it subclasses HTTPProvider)."""
+    _load_web3()
+    
+    class FailoverHTTPProvider(Web3.HTTPProvider):
+        """Sends each request to the current RPC URL; on a connection error,
+        timeout, exhausted retries or a FAILOVER_STATUS response it tries the
+        next URL, and sticks with whichever one answered.
+        
+        UNRETRIED_METHODS only fail over when the request can't have reached
+        the node (connect timeout, 429); after a read timeout or 5xx the
+        first node may have the transaction, so the error is raised.
+        """
+        
+        def __init__(self, urls: List[str]):
+            super().__init__(urls[0])
+            self._providers = [get_provider(url) for url in urls]
+            self._current = 0
+        
+        def make_request(self, method, params):
+            return self._failover(lambda p: p.make_request(method, params),
+                                  resendable=method not in UNRETRIED_METHODS)
+        
+        def make_batch_request(self, batch_requests):
+            return self._failover(lambda p: p.make_batch_request(batch_requests))
+        
+        def _failover(self, send, resendable: bool = True):
+            start = self._current
+            error = None
+            for i in range(len(self._providers)):
+                index = (start + i) % len(self._providers)
+                try:
+                    result = send(self._providers[index])
+                except requests.ConnectTimeout as e:
+                    error = e
+                    continue
+                except (requests.ConnectionError, requests.Timeout,
+                        requests.exceptions.RetryError) as e:
+                    if not resendable:
+                        raise
+                    error = e
+                    continue
+                except requests.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else None
+                    if status not in FAILOVER_STATUS or (not resendable and status != 429):
+                        raise
+                    error = e
+                    continue
+                self._current = index
+                return result
+            raise error
+    
+    return FailoverHTTPProvider
+
+_W3 = {}
+
+def get_w3(url: Optional[str] = None):
+    """One Web3 per RPC URL, shared by every ANTWallet in the process.
+    
+    url=None fails over across ARBITRUM_RPCS.
+    """
+    if url not in _W3:
+        _load_web3()
+        provider = get_provider(url) if url else _failover_provider_class()(ARBITRUM_RPCS)
+        _W3[url] = _make_w3(provider)
+    return _W3[url]
 
 
 class ANTWallet:
     """Handles ANT transfers on Arbitrum."""
     
-    def __init__(self, private_key: str = None):
+    def __init__(self, private_key: str = None, provider=None, verbose: bool = True):
         if not HAS_WEB3:
             raise ImportError("web3 not installed")
+        _load_web3()
         
-        self.w3 = Web3(Web3.HTTPProvider(ARBITRUM_RPC))
-        # Add PoA middleware for Arbitrum
-        self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+        self.w3 = _make_w3(provider) if provider else get_w3()
         
         # Get private key
-        self.private_key = private_key or os.getenv("ANT_PRIVATE_KEY")
-        if not self.private_key:
+        private_key = private_key or os.getenv("ANT_PRIVATE_KEY")
+        if not private_key:
             raise ValueError("No private key provided. Set ANT_PRIVATE_KEY env var.")
         
-        # Derive address
-        self.account = self.w3.eth.account.from_key(self.private_key)
+        # Derive address; the key itself is only kept inside the account
+        self.account = Account.from_key(private_key)
         self.address = self.account.address
         
         # ANT contract
         self.ant_contract = self.w3.eth.contract(
-            address=Web3.to_checksum_address(ANT_CONTRACT),
-            abi=ERC20_ABI
+            address=_checksum(ANT_CONTRACT),
+            abi=erc20_abi()
         )
         
-        print(f"Wallet initialized: {self.address[:10]}...{self.address[-6:]}")
+        # Local nonce counter: next unreserved nonce (None = read from the
+        # node), guarded by _nonce_lock so concurrent sends never share one
+        self._nonce_lock = threading.Lock()
+        self._next_nonce = None
+        self._nonce_synced = 0.0
+        self._gas_cache = (0.0, 0)  # (monotonic time fetched, gas price)
+        
+        # verbose=False silences progress output (errors still print), for
+        # callers sending many transfers in a loop
+        self.verbose = verbose
+        self._display_address = f"{self.address[:10]}...{self.address[-6:]}"
+        if verbose:
+            print(f"Wallet initialized: {self._display_address}")
+    
+    @cached_property
+    def ant_decimals(self) -> int:
+        """ANT decimals() (immutable, so fetched on first use and kept)."""
+        return self.ant_contract.functions.decimals().call()
+    
+    @cached_property
+    def _ant_unit(self) -> int:
+        """Base units per ANT."""
+        return 10 ** self.ant_decimals
     
     def get_eth_balance(self) -> float:
         """Get ETH balance for gas."""
@@ -76,13 +336,57 @@ class ANTWallet:
     def get_ant_balance(self) -> float:
         """Get ANT token balance."""
         try:
-            decimals = self.ant_contract.functions.decimals().call()
-            balance = self.ant_contract.functions.balanceOf(self.address).call()
-            return balance / (10 ** decimals)
+            return self.get_many_balances([self.address])[0]
         except Exception as e:
             print(f"Error getting ANT balance: {e}")
             return 0.0
     
+    @cached_property
+    def multicall(self):
+        """Multicall3 contract binding."""
+        return self.w3.eth.contract(address=_checksum(MULTICALL3_CONTRACT),
+                                    abi=multicall3_abi())
+    
+    def get_many_balances(self, addresses: List[str]) -> List[float]:
+        """ANT balances of many addresses in one eth_call (Multicall3).
+        
+        decimals() rides along in the same call until it is cached, and
+        every balance is read from the same block.
+        """
+        token = self.ant_contract.address
+        calls = [(token, BALANCE_OF_SELECTOR + _address_word(_checksum(a))) for a in addresses]
+        need_decimals = "ant_decimals" not in self.__dict__
+        if need_decimals:
+            calls.append((token, DECIMALS_SELECTOR))
+        
+        _, results = self.multicall.functions.aggregate(calls).call()
+        results = list(results)
+        if need_decimals:
+            self.ant_decimals = int.from_bytes(results.pop(), "big")
+        return [int.from_bytes(r, "big") / self._ant_unit for r in results]
+    
+    def get_status_bundle(self) -> Tuple[float, float, int]:
+        """(ETH balance, ANT balance, ANT decimals) in one JSON-RPC batch.
+        
+        Falls back to one call each if the RPC rejects batch requests.
+        """
+        need_decimals = "ant_decimals" not in self.__dict__
+        try:
+            with self.w3.batch_requests() as batch:
+                batch.add(self.w3.eth.get_balance(self.address))
+                batch.add(self.ant_contract.functions.balanceOf(self.address))
+                if need_decimals:
+                    batch.add(self.ant_contract.functions.decimals())
+                results = batch.execute()
+        except Exception:
+            return self.get_eth_balance(), self.get_ant_balance(), self.ant_decimals
+        
+        if need_decimals:
+            self.ant_decimals = results[2]
+        balance_wei, balance = results[0], results[1]
+        return (float(self.w3.from_wei(balance_wei, 'ether')),
+                balance / self._ant_unit, self.ant_decimals)
+    
     def transfer_ant(self, to_address: str, amount: float, 
                      dry_run: bool = True) -> Optional[str]:
         """Transfer ANT tokens to another address.
@@ -96,51 +400,217 @@ class ANTWallet:
             Transaction hash if successful
         """
         try:
-            to_address = Web3.to_checksum_address(to_address)
-            decimals = self.ant_contract.functions.decimals().call()
-            amount_wei = int(amount * (10 ** decimals))
+            to_address = _checksum(to_address)
+            amount_wei = _to_base_units(amount, self._ant_unit)
             
-            # Build transaction
-            nonce = self.w3.eth.get_transaction_count(self.address)
-            gas_price = self.w3.eth.gas_price
+            # Build transaction (calldata spliced by hand, no ABI encoder
+            # or estimateGas call)
+            nonce, fees = self._tx_params(reserve=not dry_run)
             
-            tx = self.ant_contract.functions.transfer(
-                to_address, amount_wei
-            ).build_transaction({
-                'chainId': 42161,  # Arbitrum One
+            tx = {
+                'chainId': ARBITRUM_CHAIN_ID,
+                'to': self.ant_contract.address,
+                'value': 0,
+                'data': _transfer_calldata(to_address, amount_wei),
                 'gas': 100000,
-                'gasPrice': gas_price,
-                'nonce': nonce
-            })
+                'nonce': nonce,
+                **fees
+            }
             
             if dry_run:
-                print(f"[DRY RUN] Would transfer {amount} ANT")
-                print(f"  From: {self.address}")
-                print(f"  To: {to_address}")
-                print(f"  Gas estimate: {tx['gas']}")
+                if self.verbose:
+                    print(f"[DRY RUN] Would transfer {amount} ANT")
+                    print(f"  From: {self.address}")
+                    print(f"  To: {to_address}")
+                    print(f"  Gas estimate: {tx['gas']}")
                 return "dry_run_tx_hash"
             
             # Sign and send
-            signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            tx_hash = self._sign_and_send(tx)
             
-            print(f"✓ Transfer submitted!")
-            print(f"  Amount: {amount} ANT")
-            print(f"  To: {to_address}")
-            print(f"  TX: {tx_hash.hex()}")
+            if self.verbose:
+                print(f"✓ Transfer submitted!")
+                print(f"  Amount: {amount} ANT")
+                print(f"  To: {to_address}")
+                print(f"  TX: {tx_hash}")
             
-            return tx_hash.hex()
+            return tx_hash
             
         except Exception as e:
             print(f"Transfer error: {e}")
+            self._resync_nonce()
+            return None
+    
+    def transfer_ant_batch(self, recipients: List[Tuple[str, float]],
+                           dry_run: bool = True) -> Optional[str]:
+        """Transfer ANT to many addresses in one Disperse transaction.
+        
+        One transaction pays the 21000 base gas once instead of per
+        recipient. Disperse pulls the tokens with transferFrom, so if its
+        allowance is short the wallet first approves exactly the batch
+        total and waits for that to confirm.
+        
+        Args:
+            recipients: (address, amount in ANT) pairs
+            dry_run: If True, only simulate (default safe)
+            
+        Returns:
+            Transaction hash if successful
+        """
+        if not recipients:
+            print("Batch transfer error: no recipients")
+            return None
+        if any(amount <= 0 for _, amount in recipients):
+            print("Batch transfer error: every amount must be positive")
+            return None
+        if len(recipients) == 1:
+            return self.transfer_ant(*recipients[0], dry_run=dry_run)
+        if not DISPERSE_CONTRACT:
+            print("Batch transfer error: DISPERSE_CONTRACT env var not set")
+            return None
+        
+        try:
+            disperse = self.w3.eth.contract(address=_checksum(DISPERSE_CONTRACT),
+                                            abi=disperse_abi())
+            addresses = [_checksum(address) for address, _ in recipients]
+            amounts_wei = [_to_base_units(amount, self._ant_unit) for _, amount in recipients]
+            total_wei = sum(amounts_wei)
+            
+            if dry_run:
+                if self.verbose:
+                    print(f"[DRY RUN] Would transfer {total_wei / self._ant_unit} ANT "
+                          f"to {len(addresses)} recipients in one transaction")
+                    print(f"  From: {self.address}")
+                    print(f"  Via: {disperse.address}")
+                return "dry_run_tx_hash"
+            
+            allowance = self.ant_contract.functions.allowance(
+                self.address, disperse.address
+            ).call()
+            if allowance < total_wei:
+                nonce, fees = self._tx_params()
+                approve_tx = self.ant_contract.functions.approve(
+                    disperse.address, total_wei
+                ).build_transaction({
+                    'chainId': ARBITRUM_CHAIN_ID,
+                    'gas': 100000,
+                    'nonce': nonce,
+                    **fees
+                })
+                if self.verbose:
+                    print(f"Approving Disperse for {total_wei / self._ant_unit} ANT...")
+                if not self.wait_for_confirmation(self._sign_and_send(approve_tx)):
+                    return None
+            
+            # Gas is estimated by the node (scales with the recipient count)
+            nonce, fees = self._tx_params()
+            tx = disperse.functions.disperseToken(
+                self.ant_contract.address, addresses, amounts_wei
+            ).build_transaction({
+                'chainId': ARBITRUM_CHAIN_ID,
+                'nonce': nonce,
+                **fees
+            })
+            tx_hash = self._sign_and_send(tx)
+            
+            if self.verbose:
+                print(f"✓ Batch transfer submitted!")
+                print(f"  Amount: {total_wei / self._ant_unit} ANT to {len(addresses)} recipients")
+                print(f"  TX: {tx_hash}")
+            
+            return tx_hash
+            
+        except Exception as e:
+            print(f"Batch transfer error: {e}")
+            self._resync_nonce()
             return None
     
+    def _tx_params(self, reserve: bool = True) -> Tuple[int, dict]:
+        """(nonce, EIP-1559 fee fields) for the next transaction.
+        
+        reserve=True takes the nonce for a transaction that will be sent;
+        reserve=False (dry runs) only peeks at it. At most one round trip:
+        the nonce comes from the local counter between resyncs, and a gas
+        price younger than FEE_CACHE_TTL_S is reused, so a burst of sends
+        mostly needs no RPC at all.
+        """
+        with self._nonce_lock:
+            now = time.monotonic()
+            stale = self._next_nonce is None or now - self._nonce_synced > NONCE_RESYNC_S
+            fetched_at, gas_price = self._gas_cache
+            fresh = now - fetched_at < FEE_CACHE_TTL_S
+            
+            if stale and not fresh:
+                try:
+                    with self.w3.batch_requests() as batch:
+                        batch.add(self.w3.eth.get_transaction_count(self.address, 'pending'))
+                        batch.add(self.w3.eth.gas_price)
+                        synced, gas_price = batch.execute()
+                except Exception:  # RPC without batch support
+                    synced = self.w3.eth.get_transaction_count(self.address, 'pending')
+                    gas_price = self.w3.eth.gas_price
+            elif stale:
+                synced = self.w3.eth.get_transaction_count(self.address, 'pending')
+            elif not fresh:
+                gas_price = self.w3.eth.gas_price
+            
+            if stale:
+                # A periodic resync only moves forward: 'pending' can lag
+                # sends the node hasn't seen yet. Only _resync_nonce()
+                # (counter None) lets it drop back.
+                if self._next_nonce is not None:
+                    synced = max(self._next_nonce, synced)
+                self._next_nonce, self._nonce_synced = synced, now
+            if not fresh:
+                self._gas_cache = (now, gas_price)
+            nonce = self._next_nonce
+            if reserve:
+                self._next_nonce += 1
+        return nonce, _eip1559_fees(gas_price)
+    
+    def _resync_nonce(self):
+        """Drop the local nonce counter; the next send re-reads it from the node.
+        
+        Called when a reserved nonce may not have reached the chain, so the
+        counter can't leave a gap that would stall later transactions.
+        """
+        with self._nonce_lock:
+            self._next_nonce = None
+    
+    def _sign_and_send(self, tx: dict) -> str:
+        """Sign and broadcast tx; returns its hash.
+        
+        A node that already has this exact transaction (an earlier attempt
+        did reach it) answers "already known", or "nonce too low" once it
+        is mined: both count as sent if the node knows our hash.
+        """
+        signed_tx = self.account.sign_transaction(tx)
+        try:
+            return self.w3.eth.send_raw_transaction(signed_tx.raw_transaction).hex()
+        except Exception as e:
+            message = str(e).lower()
+            if "already known" in message:
+                return signed_tx.hash.hex()
+            if "nonce too low" in message and self._tx_known(signed_tx.hash):
+                return signed_tx.hash.hex()
+            raise
+    
+    def _tx_known(self, tx_hash) -> bool:
+        try:
+            return self.w3.eth.get_transaction(tx_hash) is not None
+        except Exception:
+            return False
+    
     def wait_for_confirmation(self, tx_hash: str, timeout: int = 120) -> bool:
         """Wait for transaction confirmation."""
         try:
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout)
+            receipt = self.w3.eth.wait_for_transaction_receipt(
+                tx_hash, timeout,
+                poll_latency=CHAIN_POLLING_INTERVALS.get(ARBITRUM_CHAIN_ID, DEFAULT_POLLING_INTERVAL)
+            )
             if receipt['status'] == 1:
-                print(f"✓ Transaction confirmed in block {receipt['blockNumber']}")
+                if self.verbose:
+                    print(f"✓ Transaction confirmed in block {receipt['blockNumber']}")
                 return True
             else:
                 print(f"✗ Transaction failed")
@@ -150,6 +620,179 @@ class ANTWallet:
             return False
 
 
+class AsyncANTWallet:
+    """asyncio version of ANTWallet, for scanning many balances at once.
+    
+    Calls on one wallet share the provider's aiohttp session, so awaiting
+    several of them together (see gather_balances) overlaps their round
+    trips. Call close() when done.
+    """
+    
+    def __init__(self, private_key: str = None, verbose: bool = True):
+        if not HAS_WEB3:
+            raise ImportError("web3 not installed")
+        _load_web3()
+        
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(ARBITRUM_RPC))
+        self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+        
+        private_key = private_key or os.getenv("ANT_PRIVATE_KEY")
+        if not private_key:
+            raise ValueError("No private key provided. Set ANT_PRIVATE_KEY env var.")
+        
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        
+        self.ant_contract = self.w3.eth.contract(
+            address=_checksum(ANT_CONTRACT),
+            abi=erc20_abi()
+        )
+        self._ant_unit = None  # 10 ** decimals, fetched on first use
+        
+        # Local nonce counter, as in ANTWallet: gathered transfers each
+        # reserve their own nonce under _nonce_lock
+        self._nonce_lock = asyncio.Lock()
+        self._next_nonce = None
+        self._nonce_synced = 0.0
+        self._gas_cache = (0.0, 0)  # (monotonic time fetched, gas price)
+        
+        self.verbose = verbose  # False silences progress output (see ANTWallet)
+    
+    async def close(self):
+        """Close the provider's HTTP session."""
+        await self.w3.provider.disconnect()
+    
+    async def ant_unit(self) -> int:
+        """Base units per ANT (decimals is immutable, so fetched once)."""
+        if self._ant_unit is None:
+            self._ant_unit = 10 ** await self.ant_contract.functions.decimals().call()
+        return self._ant_unit
+    
+    async def get_eth_balance(self) -> float:
+        """Get ETH balance for gas."""
+        balance_wei = await self.w3.eth.get_balance(self.address)
+        return float(self.w3.from_wei(balance_wei, 'ether'))
+    
+    async def get_ant_balance(self) -> float:
+        """Get ANT token balance."""
+        try:
+            unit, balance = await asyncio.gather(
+                self.ant_unit(),
+                self.ant_contract.functions.balanceOf(self.address).call()
+            )
+            return balance / unit
+        except Exception as e:
+            print(f"Error getting ANT balance: {e}")
+            return 0.0
+    
+    async def gather_balances(self, addresses: List[str]) -> List[float]:
+        """ANT balances of many addresses, with all calls in flight at once."""
+        unit = await self.ant_unit()
+        balances = await asyncio.gather(*(
+            self.ant_contract.functions.balanceOf(_checksum(a)).call()
+            for a in addresses
+        ))
+        return [b / unit for b in balances]
+    
+    async def transfer_ant(self, to_address: str, amount: float,
+                           dry_run: bool = True) -> Optional[str]:
+        """Transfer ANT tokens to another address (see ANTWallet.transfer_ant)."""
+        try:
+            to_address = _checksum(to_address)
+            unit, (nonce, fees) = await asyncio.gather(
+                self.ant_unit(),
+                self._tx_params(reserve=not dry_run)
+            )
+            amount_wei = _to_base_units(amount, unit)
+            
+            tx = {
+                'chainId': ARBITRUM_CHAIN_ID,
+                'to': self.ant_contract.address,
+                'value': 0,
+                'data': _transfer_calldata(to_address, amount_wei),
+                'gas': 100000,
+                'nonce': nonce,
+                **fees
+            }
+            
+            if dry_run:
+                if self.verbose:
+                    print(f"[DRY RUN] Would transfer {amount} ANT")
+                    print(f"  From: {self.address}")
+                    print(f"  To: {to_address}")
+                    print(f"  Gas estimate: {tx['gas']}")
+                return "dry_run_tx_hash"
+            
+            tx_hash = await self._sign_and_send(tx)
+            
+            if self.verbose:
+                print(f"✓ Transfer submitted!")
+                print(f"  Amount: {amount} ANT")
+                print(f"  To: {to_address}")
+                print(f"  TX: {tx_hash}")
+            
+            return tx_hash
+            
+        except Exception as e:
+            print(f"Transfer error: {e}")
+            await self._resync_nonce()
+            return None
+    
+    async def _tx_params(self, reserve: bool = True) -> Tuple[int, dict]:
+        """(nonce, EIP-1559 fee fields) for the next transaction (see ANTWallet._tx_params)."""
+        async with self._nonce_lock:
+            now = time.monotonic()
+            stale = self._next_nonce is None or now - self._nonce_synced > NONCE_RESYNC_S
+            fetched_at, gas_price = self._gas_cache
+            fresh = now - fetched_at < FEE_CACHE_TTL_S
+            
+            if stale and not fresh:
+                synced, gas_price = await asyncio.gather(
+                    self.w3.eth.get_transaction_count(self.address, 'pending'),
+                    self.w3.eth.gas_price
+                )
+            elif stale:
+                synced = await self.w3.eth.get_transaction_count(self.address, 'pending')
+            elif not fresh:
+                gas_price = await self.w3.eth.gas_price
+            
+            if stale:
+                # Periodic resyncs only move forward; see ANTWallet._tx_params
+                if self._next_nonce is not None:
+                    synced = max(self._next_nonce, synced)
+                self._next_nonce, self._nonce_synced = synced, now
+            if not fresh:
+                self._gas_cache = (now, gas_price)
+            nonce = self._next_nonce
+            if reserve:
+                self._next_nonce += 1
+        return nonce, _eip1559_fees(gas_price)
+    
+    async def _resync_nonce(self):
+        """Drop the local nonce counter (see ANTWallet._resync_nonce)."""
+        async with self._nonce_lock:
+            self._next_nonce = None
+    
+    async def _sign_and_send(self, tx: dict) -> str:
+        """Sign and broadcast tx; duplicates count as sent (see ANTWallet._sign_and_send)."""
+        signed_tx = self.account.sign_transaction(tx)
+        try:
+            return (await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)).hex()
+        except Exception as e:
+            message = str(e).lower()
+            if "already known" in message:
+                return signed_tx.hash.hex()
+            if "nonce too low" in message and await self._tx_known(signed_tx.hash):
+                return signed_tx.hash.hex()
+            raise
+    
+    async def _tx_known(self, tx_hash) -> bool:
+        try:
+            return await self.w3.eth.get_transaction(tx_hash) is not None
+        except Exception:
+            return False
+
+
 def main():
     """Test wallet functionality."""
     import sys
@@ -159,6 +802,7 @@ def main():
         print("Commands:")
         print("  status              - Show wallet status")
         print("  transfer <to> <amt> - Transfer ANT (dry run)")
+        print("  balances <addr>...  - ANT balances of several addresses")
         print("  transfer-real       - Transfer ANT for real")
         return
     
@@ -179,9 +823,10 @@ def main():
         return
     
     if cmd == "status":
+        eth_balance, ant_balance, _ = wallet.get_status_bundle()
         print(f"\nWallet: {wallet.address}")
-        print(f"ETH balance: {wallet.get_eth_balance():.6f} ETH")
-        print(f"ANT balance: {wallet.get_ant_balance():.4f} ANT")
+        print(f"ETH balance: {eth_balance:.6f} ETH")
+        print(f"ANT balance: {ant_balance:.4f} ANT")
     
     elif cmd == "transfer":
         if len(sys.argv) < 4:
@@ -191,6 +836,19 @@ def main():
         amount = float(sys.argv[3])
         wallet.transfer_ant(to_addr, amount, dry_run=True)
     
+    elif cmd == "balances":
+        addresses = sys.argv[2:]
+        
+        async def scan():
+            async_wallet = AsyncANTWallet(private_key)
+            try:
+                return await async_wallet.gather_balances(addresses)
+            finally:
+                await async_wallet.close()
+        
+        for address, balance in zip(addresses, asyncio.run(scan())):
+            print(f"  {address}: {balance:.4f} ANT")
+    
     elif cmd == "transfer-real":
         print("⚠ Real transfers disabled in test mode")
         print("  Edit code to enable actual transfers")